@@ -0,0 +1,162 @@
+# answer_cache.py
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from retrieval import tokenize, STOPWORDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "500"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+# Minimum word overlap (Jaccard) for a differently phrased question to reuse an answer; 1 disables it
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0.75"))
+# Questions with fewer content words ("Et la production ?") depend on the conversation and are not cached
+ANSWER_CACHE_MIN_TERMS = int(os.environ.get("ANSWER_CACHE_MIN_TERMS", "2"))
+
+
+# Unlike retrieval, the cache key must keep the words that change a question's meaning
+# ("Quels processus ne sont pas conformes ?"): negations and comparisons
+MEANING_WORDS = frozenset("ne n pas plus moins sans aucun aucune jamais non not no without more less than".split())
+KEY_STOPWORDS = STOPWORDS - MEANING_WORDS
+NEGATIONS = {"n": "ne"}  # "n'est pas" and "ne sont pas" give the same term
+# Words pointing back at earlier turns ("ce processus", "celle-ci", "it"): such a question means
+# something different in each conversation
+REFERENCE_WORDS = frozenset("""
+ce cet cette ces ceci cela ca celui celle ceux celles ci dernier derniere precedent precedente precedents
+lui leur leurs son sa ses elle elles ils
+this that these those it its they them their previous above latter former
+""".split())
+EST_CE = re.compile(r"\best[- ]ce\b")  # "est-ce que" asks a question, it does not refer back
+
+
+def refers_back(question):
+    """Whether ``question`` points at something said earlier in the conversation."""
+    return any(word in REFERENCE_WORDS for word in tokenize(EST_CE.sub(" ", question.lower()), ()))
+
+
+def fold_term(term):
+    """``term`` with its plural folded; negations and comparisons ("plus", "moins", "sans") are kept as is."""
+    if term in MEANING_WORDS:
+        return NEGATIONS.get(term, term)
+    return term[:-1] if len(term) > 3 and term.endswith(("s", "x")) else term
+
+
+def question_terms(question):
+    """Words of a question that decide its answer, accent-free and with plurals folded."""
+    return frozenset(fold_term(term) for term in tokenize(question, KEY_STOPWORDS))
+
+
+class AnswerCache:
+    """In-memory chat answer cache keyed by audit context hash and normalized question.
+
+    Follow-up questions that refer back to the conversation are left to the
+    caller to skip (see ``refers_back``). A question whose terms match a cached
+    question of the same context closely enough (Jaccard similarity >=
+    ANSWER_CACHE_SIMILARITY) also reuses its answer, unless their negations or
+    comparisons differ. Entries expire after ``ttl`` seconds and the least
+    recently used are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL,
+                 similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.entries = OrderedDict()  # (context hash, terms) -> (answer, stored at), least recently used first
+        self.contexts = {}  # context hash -> set of terms cached for it, for the similarity scan
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.follow_ups = 0
+        self.lock = threading.Lock()
+
+    def _lookup(self, context_hash, terms):
+        if (context_hash, terms) in self.entries:
+            return (context_hash, terms), False
+        best, best_score = None, self.similarity
+        meaning = terms & MEANING_WORDS
+        for cached in self.contexts.get(context_hash, ()):
+            if cached & MEANING_WORDS != meaning:
+                # A negated or compared question never reuses the answer to the plain one
+                continue
+            score = len(terms & cached) / len(terms | cached)
+            if score >= best_score:
+                best, best_score = cached, score
+        return ((context_hash, best), True) if best is not None else (None, False)
+
+    def skip_follow_up(self):
+        """Count a question left out of the cache because it depends on the conversation."""
+        with self.lock:
+            self.follow_ups += 1
+
+    def get(self, context_hash, question):
+        """The cached answer to ``question`` in this context, or None."""
+        terms = question_terms(question)
+        if len(terms) < ANSWER_CACHE_MIN_TERMS:
+            return None
+        with self.lock:
+            key, similar = self._lookup(context_hash, terms)
+            if key is not None and time.monotonic() - self.entries[key][1] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                key = None
+            if key is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            if similar:
+                self.similar_hits += 1
+            return self.entries[key][0]
+
+    def set(self, context_hash, question, answer):
+        terms = question_terms(question)
+        if len(terms) < ANSWER_CACHE_MIN_TERMS or not answer:
+            return
+        key = (context_hash, terms)
+        with self.lock:
+            self.entries[key] = (answer, time.monotonic())
+            self.entries.move_to_end(key)
+            self.contexts.setdefault(context_hash, set()).add(terms)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        del self.entries[key]
+        context_hash, terms = key
+        cached = self.contexts[context_hash]
+        cached.discard(terms)
+        if not cached:
+            del self.contexts[context_hash]
+
+    def clear(self):
+        with self.lock:
+            count = len(self.entries)
+            self.entries.clear()
+            self.contexts.clear()
+            return count
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "contexts": len(self.contexts),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "follow_ups": self.follow_ups,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,136 @@
+# audio_codec.py
+import os
+import asyncio
+import shutil
+import time
+import numpy as np
+import logging
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):
+    # Optional: ffmpeg is used instead when soundfile/libsndfile is not installed
+    sf = None
+
+logger = logging.getLogger(__name__)
+
+# Codec for audio sent to Whisper and for stored recordings: "wav" (no encoding), "flac" or "opus"
+AUDIO_UPLOAD_CODEC = os.environ.get("AUDIO_UPLOAD_CODEC", "flac")
+AUDIO_STORAGE_CODEC = os.environ.get("AUDIO_STORAGE_CODEC", "wav")
+OPUS_BITRATE = os.environ.get("OPUS_BITRATE", "24k")
+BLOCK_FRAMES = 16000 * 60
+
+CODEC_EXTENSIONS = {"flac": ".flac", "opus": ".ogg"}
+SOUNDFILE_FORMATS = {"flac": ("FLAC", "PCM_16"), "opus": ("OGG", "OPUS")}
+FFMPEG_ARGUMENTS = {"flac": ["-c:a", "flac"], "opus": ["-c:a", "libopus", "-b:a", OPUS_BITRATE]}
+
+encoding_stats = {}  # codec -> {"files", "bytes_in", "bytes_out", "encode_seconds"}
+# codec -> {"requests", "bytes_sent", "request_seconds"}; request time is the round trip of the successful
+# attempt (upload and inference), without queueing or retries, so it is not a measure of upload time alone
+upload_stats = {}
+
+
+def _transcode(input_path, output_path, file_format, subtype, block_frames=BLOCK_FRAMES):
+    """Re-encode an audio file as mono with libsndfile, one block at a time."""
+    with sf.SoundFile(input_path) as src:
+        with sf.SoundFile(output_path, "w", samplerate=src.samplerate, channels=1,
+                          format=file_format, subtype=subtype) as dst:
+            for block in src.blocks(blocksize=block_frames, dtype="int16", always_2d=True):
+                dst.write(block[:, 0] if block.shape[1] == 1 else block.mean(axis=1).astype(np.int16))
+
+
+async def _encode_with_ffmpeg(input_path, output_path, codec):
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", input_path,
+        *FFMPEG_ARGUMENTS[codec], output_path,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode(errors="replace"))
+
+
+def can_encode(codec):
+    return codec in CODEC_EXTENSIONS and (sf is not None or shutil.which("ffmpeg") is not None)
+
+
+async def encode_audio(input_path, codec, output_dir=None):
+    """Encode a PCM WAV file with ``codec`` and return the encoded path.
+
+    The encoded file keeps the input's base name and is written next to it, or
+    into ``output_dir`` when given.
+
+    Returns the input path unchanged when the codec is "wav", the input is not a
+    WAV file, or neither soundfile nor ffmpeg is available.
+    """
+    if codec == "wav" or not input_path.lower().endswith(".wav"):
+        return input_path
+    if not can_encode(codec):
+        logger.debug(f"No encoder available for {codec}, keeping {input_path} as WAV")
+        return input_path
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(output_dir or os.path.dirname(input_path), base + CODEC_EXTENSIONS[codec])
+    started = time.perf_counter()
+    try:
+        if sf is not None:
+            await asyncio.to_thread(_transcode, input_path, output_path, *SOUNDFILE_FORMATS[codec])
+        else:
+            await _encode_with_ffmpeg(input_path, output_path, codec)
+    except Exception as e:
+        logger.error(f"Encoding {input_path} as {codec} failed, keeping WAV: {str(e)}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return input_path
+    stats = encoding_stats.setdefault(codec, {"files": 0, "bytes_in": 0, "bytes_out": 0, "encode_seconds": 0.0})
+    stats["files"] += 1
+    stats["bytes_in"] += os.path.getsize(input_path)
+    stats["bytes_out"] += os.path.getsize(output_path)
+    stats["encode_seconds"] += time.perf_counter() - started
+    return output_path
+
+
+async def decode_with_soundfile(input_path, output_path):
+    """Decode a FLAC/Ogg file to a mono 16-bit WAV at its native rate. Returns None on failure."""
+    if sf is None:
+        return None
+    try:
+        await asyncio.to_thread(_transcode, input_path, output_path, "WAV", "PCM_16")
+    except Exception as e:
+        logger.error(f"soundfile failed to decode {input_path}: {str(e)}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    return output_path
+
+
+def record_upload(audio_path, seconds):
+    """Record the size and round-trip time of one transcription request."""
+    codec = os.path.splitext(audio_path)[1].lstrip(".").lower() or "unknown"
+    stats = upload_stats.setdefault(codec, {"requests": 0, "bytes_sent": 0, "request_seconds": 0.0})
+    stats["requests"] += 1
+    stats["bytes_sent"] += os.path.getsize(audio_path)
+    stats["request_seconds"] += seconds
+
+
+def get_metrics():
+    encoding = {
+        codec: {
+            **stats,
+            "bytes_saved": stats["bytes_in"] - stats["bytes_out"],
+            "compression_ratio": stats["bytes_in"] / stats["bytes_out"] if stats["bytes_out"] else None,
+        }
+        for codec, stats in encoding_stats.items()
+    }
+    uploads = {
+        codec: {
+            **stats,
+            "average_request_seconds": stats["request_seconds"] / stats["requests"] if stats["requests"] else None,
+        }
+        for codec, stats in upload_stats.items()
+    }
+    return {
+        "upload_codec": AUDIO_UPLOAD_CODEC,
+        "storage_codec": AUDIO_STORAGE_CODEC,
+        "encoding": encoding,
+        "uploads": uploads,
+    }
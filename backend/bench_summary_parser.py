@@ -0,0 +1,217 @@
+# bench_summary_parser.py
+"""Micro-benchmark of summary_parser against the previous summary parsing code.
+
+Usage: python bench_summary_parser.py [--items N] [--repeat N]
+"""
+import argparse
+import re
+import timeit
+from summary_parser import parse_summary
+
+
+def legacy_parse_summary(summary, language="fr"):
+    """The previous two-pass regex parser from summarization.py, kept for comparison."""
+    # Parse the summary into structured data (Parsing logic now language-aware)
+    structured_data = {}
+    if language == "en":
+        client_match = re.search(r"Audit of (.+?) \((.+?)\)", summary)
+        period_match = re.search(r"conducted from (.+?) to (.+?) according", summary)
+        standard_match = re.search(r"according to the (.+?)\.", summary)
+        type_match = re.search(r"Audit Type: (.+)", summary)
+        auditor_match = re.search(r"Lead Auditor: (.+)", summary)
+        manager_match = re.search(r"Audit Manager: (.+)", summary)
+        team_match = re.search(r"Audit Team: (.+)", summary)
+        system_match = re.search(r"Management System: (.+)", summary)
+        nonconf_match = re.search(r"Non-conformities detected: (\d+)", summary)
+    else:
+        client_match = re.search(r"Audit de (.+?) \((.+?)\)", summary)
+        period_match = re.search(r"mené du (.+?) au (.+?) selon", summary)
+        standard_match = re.search(r"selon la norme (.+?)\.", summary)
+        type_match = re.search(r"Type d'audit: (.+)", summary)
+        auditor_match = re.search(r"Auditeur Principal: (.+)", summary)
+        manager_match = re.search(r"Responsable de l'audit: (.+)", summary)
+        team_match = re.search(r"Équipe d'audit: (.+)", summary)
+        system_match = re.search(r"Système de gestion: (.+)", summary)
+        nonconf_match = re.search(r"Non-conformités détectées: (\d+)", summary)
+
+    structured_data["client_name"] = client_match.group(1) if client_match else "Non spécifié" if language == "fr" else "Not specified"
+    structured_data["client_address"] = client_match.group(2) if client_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    start_date = period_match.group(1) if period_match else "Non spécifié" if language == "fr" else "Not specified"
+    end_date = period_match.group(2) if period_match else "Non spécifié" if language == "fr" else "Not specified"
+    structured_data["audit_period"] = f"{start_date} - {end_date}"
+
+    standard_match = re.search(r"norme (.+?)\.", summary) if language == "en" else re.search(r"norme (.+?)\.", summary) # both prompts use "norme" before the standard.
+    structured_data["reference_standard"] = standard_match.group(1) if standard_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    audit_type_regex = r"Audit Type: (.+)" if language == "en" else r"Type d'audit: (.+)"
+    type_match = re.search(audit_type_regex, summary)
+    structured_data["audit_type"] = type_match.group(1) if type_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    auditor_name_regex = r"Lead Auditor: (.+)" if language == "en" else r"Auditeur Principal: (.+)"
+    auditor_match = re.search(auditor_name_regex, summary)
+    structured_data["auditor_name"] = auditor_match.group(1) if auditor_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    audit_manager_regex = r"Audit Manager: (.+)" if language == "en" else r"Responsable de l'audit: (.+)"
+    manager_match = re.search(audit_manager_regex, summary)
+    structured_data["audit_manager"] = manager_match.group(1) if manager_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    audit_team_regex = r"Audit Team: (.+)" if language == "en" else r"Équipe d'audit: (.+)"
+    team_match = re.search(audit_team_regex, summary)
+    structured_data["audit_team_members"] = team_match.group(1) if team_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    management_system_regex = r"Management System: (.+)" if language == "en" else r"Système de gestion: (.+)"
+    system_match = re.search(management_system_regex, summary)
+    structured_data["management_system"] = system_match.group(1) if system_match else "Non spécifié" if language == "fr" else "Not specified"
+
+    non_conformities_regex = r"Non-conformities detected: (\d+)" if language == "en" else r"Non-conformités détectées: (\d+)"
+    nonconf_match = re.search(non_conformities_regex, summary)
+    structured_data["non_conformities_count"] = nonconf_match.group(1) if nonconf_match else "0"
+
+    lines = summary.split("\n")
+    compliance_items = []
+    reference_documents = []
+    processes_list = []
+    positive_points = []
+    recommendations = []
+    resume = ""
+    activity_description = ""
+    current_section = None
+
+    for line in lines:
+        line = line.strip()
+        if language == "en":
+            if line.startswith("Details of non-conformities:"):
+                current_section = "compliance"
+            elif line.startswith("Reference Documents:"):
+                current_section = "documents"
+            elif line.startswith("Audited Activity:"):
+                activity_description = line.split(":", 1)[1].strip()
+            elif line.startswith("Audited Processes:"):
+                current_section = "processes"
+            elif line.startswith("Positive Points:"):
+                current_section = "positive"
+            elif line.startswith("General Recommendations:"):
+                current_section = "recommendations"
+            elif line.startswith("Summary:"):
+                resume = line.split(":", 1)[1].strip()
+        else:
+            if line.startswith("Détails des non-conformités :"):
+                current_section = "compliance"
+            elif line.startswith("Documents de référence :"):
+                current_section = "documents"
+            elif line.startswith("Activité auditée:"):
+                activity_description = line.split(":", 1)[1].strip()
+            elif line.startswith("Processus audités :"):
+                current_section = "processes"
+            elif line.startswith("Points positifs :"):
+                current_section = "positive"
+            elif line.startswith("Recommandations générales :"):
+                current_section = "recommendations"
+            elif line.startswith("Résumé :"):
+                resume = line.split(":", 1)[1].strip()
+        if line and current_section == "compliance" and line.startswith("-"):
+            parts = line[2:].split(":", 1)
+            process_req = parts[0].strip()
+            comment_rating = parts[1].strip()
+            process_match = re.match(r"(.+?) \((.+?)\)", process_req)
+            process = process_match.group(1) if process_match else process_req
+            requirement_text = "Not specified" if language == "en" else "Non spécifié"
+            requirement = process_match.group(2) if process_match else requirement_text
+
+            if language == "en":
+                comment_match = re.match(r"(.+?) \(Rating: (.+?)\)", comment_rating)
+                rating_text = "Not specified"
+                no_info_text = "No information"
+            else:
+                comment_match = re.match(r"(.+?) \(Évaluation: (.+?)\)", comment_rating)
+                rating_text = "Non spécifié"
+                no_info_text = "Aucune information"
+
+            comment = comment_match.group(1) if comment_match else comment_rating
+            rating = comment_match.group(2) if comment_match else rating_text
+            compliance_items.append({"process": process, "requirement": requirement, "comment": comment, "rating": rating})
+        elif line and current_section in ["documents", "processes", "positive", "recommendations"] and line.startswith("- "):
+            item = line[2:].strip()
+            if current_section == "documents":
+                reference_documents.append(item)
+            elif current_section == "processes":
+                processes_list.append(item)
+            elif current_section == "positive":
+                positive_points.append(item)
+            elif current_section == "recommendations":
+                recommendations.append(item)
+
+    not_specified = "Not specified" if language == "en" else "Non spécifié"
+    no_info = "No information" if language == "en" else "Aucune information"
+    no_positive = "No positive points mentioned" if language == "en" else "Aucun point positif mentionné"
+    no_recommendations = "No recommendations provided" if language == "en" else "Aucune recommandation fournie"
+    no_summary = "No summary provided" if language == "en" else "Aucun résumé fourni"
+
+    structured_data["reference_documents"] = reference_documents or [not_specified]
+    structured_data["activity_description"] = activity_description or not_specified
+    structured_data["processes_list"] = processes_list or [not_specified]
+    structured_data["compliance_items"] = compliance_items or [{"process": not_specified, "requirement": "N/A", "comment": no_info, "rating": "N/A"}]
+    structured_data["positive_points"] = positive_points or [no_positive]
+    structured_data["recommendations"] = recommendations or [no_recommendations]
+    structured_data["resume"] = resume or no_summary
+
+    return structured_data
+
+
+def sample_summary(language, items):
+    """A summary in the prompt's structure with ``items`` entries per list section."""
+    if language == "en":
+        lines = [
+            "Audit of ACME Industries (12 Harbour Road, Leeds) conducted from 3 March 2024 to 5 March 2024"
+            " according to the ISO 9001:2015.", "",
+            "Audit Type: Internal Audit", "", "Lead Auditor: Jane Smith", "", "Audit Manager: John Doe", "",
+            "Audit Team: Jane Smith, Omar Ali", "", "Management System: quality", "",
+            f"Non-conformities detected: {items}", "", "Details of non-conformities:",
+        ]
+        lines += [f"- Process {i} (clause 8.{i}): Records {i} were incomplete (Rating: Minor)" for i in range(items)]
+        sections = ["Reference Documents:", "Audited Processes:", "Positive Points:", "General Recommendations:"]
+        lines += ["", "Audited Activity: Manufacturing of metal parts"]
+        summary_line = "Summary: The management system is broadly effective."
+    else:
+        lines = [
+            "Audit de ACME Industries (12 rue du Port, Lyon) mené du 3 mars 2024 au 5 mars 2024"
+            " selon la norme ISO 9001:2015.", "",
+            "Type d'audit: Audit interne", "", "Auditeur Principal: Jeanne Martin", "",
+            "Responsable de l'audit: Jean Dupont", "", "Équipe d'audit: Jeanne Martin, Omar Ali", "",
+            "Système de gestion: qualité", "", f"Non-conformités détectées: {items}", "",
+            "Détails des non-conformités :",
+        ]
+        lines += [f"- Processus {i} (clause 8.{i}): Enregistrements {i} incomplets (Évaluation: Mineure)"
+                  for i in range(items)]
+        sections = ["Documents de référence :", "Processus audités :", "Points positifs :",
+                    "Recommandations générales :"]
+        lines += ["", "Activité auditée: Fabrication de pièces métalliques"]
+        summary_line = "Résumé : Le système de management est globalement efficace."
+    for section in sections:
+        lines += ["", section] + [f"- {section.rstrip(' :')} item {i}" for i in range(items)]
+    lines += ["", summary_line]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10, help="entries per list section")
+    parser.add_argument("--repeat", type=int, default=2000, help="parses per measurement")
+    args = parser.parse_args()
+    for language in ("fr", "en"):
+        summary = sample_summary(language, args.items)
+        legacy = legacy_parse_summary(summary, language)
+        current = parse_summary(summary, language)
+        differences = sorted(key for key in legacy if legacy[key] != current[key])
+        legacy_time = min(timeit.repeat(lambda: legacy_parse_summary(summary, language),
+                                        number=args.repeat, repeat=5)) / args.repeat
+        current_time = min(timeit.repeat(lambda: parse_summary(summary, language),
+                                         number=args.repeat, repeat=5)) / args.repeat
+        print(f"{language}: {len(summary)} chars, legacy {legacy_time * 1e6:.1f} us, "
+              f"table-driven {current_time * 1e6:.1f} us ({legacy_time / current_time:.1f}x), "
+              f"differing fields: {', '.join(differences) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
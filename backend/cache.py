@@ -0,0 +1,127 @@
+# cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("CACHE_DIR", "cache")
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Persistent JSON cache with size-bounded LRU eviction.
+
+    Each entry is stored as one file named after the SHA-256 of its key parts.
+    Recency survives restarts through the file modification time, which is
+    bumped on every hit.
+    """
+
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.directory = os.path.join(CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # filename -> size, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+            size = entry.stat().st_size
+            self.entries[entry.name] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest() + ".json"
+
+    def get(self, *parts):
+        """Return the cached value for the key parts, or None."""
+        filename = self.make_key(*parts)
+        path = os.path.join(self.directory, filename)
+        with self.lock:
+            if filename not in self.entries:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable {self.name} cache entry {filename}: {e}")
+                self._remove(filename)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(filename)
+            self.hits += 1
+            return value
+
+    def set(self, value, *parts):
+        """Store a JSON-serialisable value under the key parts and evict old entries."""
+        filename = self.make_key(*parts)
+        path = os.path.join(self.directory, filename)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self.lock:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.total_bytes -= self.entries.pop(filename, 0)
+            self.entries[filename] = len(data)
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry. Returns the number of entries removed."""
+        with self.lock:
+            count = len(self.entries)
+            for filename in list(self.entries):
+                self._remove(filename)
+            return count
+
+    def _remove(self, filename):
+        self.total_bytes -= self.entries.pop(filename, 0)
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+transcription_cache = DiskCache(
+    "transcriptions",
+    max_bytes=int(os.environ.get("TRANSCRIPTION_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+)
+
+summary_cache = DiskCache(
+    "summaries",
+    max_bytes=int(os.environ.get("SUMMARY_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+)
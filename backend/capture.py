@@ -0,0 +1,590 @@
+# capture.py
+import os
+import asyncio
+import struct
+import threading
+import time
+import wave
+from collections import deque
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Voice-activity detection for live segments (overridable through the environment)
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "1") == "1"
+VAD_FRAME_SECONDS = float(os.environ.get("VAD_FRAME_SECONDS", "0.03"))
+# A frame is speech when its RMS exceeds both this absolute level and SPEECH_RATIO x the noise floor
+VAD_MIN_DBFS = float(os.environ.get("VAD_MIN_DBFS", "-50"))
+VAD_SPEECH_RATIO = float(os.environ.get("VAD_SPEECH_RATIO", "3"))
+VAD_NOISE_WINDOW_SECONDS = float(os.environ.get("VAD_NOISE_WINDOW_SECONDS", "10"))
+# How fast the noise floor may rise, so long stretches of speech are not mistaken for noise
+VAD_NOISE_RISE_DB_PER_SECOND = float(os.environ.get("VAD_NOISE_RISE_DB_PER_SECOND", "1"))
+# Segments are cut after a pause of this length; a segment reaching its maximum length is cut at its
+# longest pause past VAD_MIN_SEGMENT_SECONDS
+VAD_PAUSE_SECONDS = float(os.environ.get("VAD_PAUSE_SECONDS", "0.6"))
+VAD_MIN_SEGMENT_SECONDS = float(os.environ.get("VAD_MIN_SEGMENT_SECONDS", "3"))
+# Segments with less speech than this are not transcribed
+VAD_MIN_SPEECH_SECONDS = float(os.environ.get("VAD_MIN_SPEECH_SECONDS", "0.3"))
+VAD_PREROLL_SECONDS = float(os.environ.get("VAD_PREROLL_SECONDS", "0.2"))
+
+# Adaptive live segment length: grows while transcription lags behind, shrinks while it keeps up
+ADAPTIVE_SEGMENTS = os.environ.get("ADAPTIVE_SEGMENTS", "1") == "1"
+SEGMENT_MIN_SECONDS = float(os.environ.get("SEGMENT_MIN_SECONDS", "5"))
+SEGMENT_MAX_SECONDS = float(os.environ.get("SEGMENT_MAX_SECONDS", "30"))
+# Target share of a segment's duration spent transcribing it (latency / audio seconds)
+SEGMENT_TARGET_LOAD = float(os.environ.get("SEGMENT_TARGET_LOAD", "0.5"))
+
+# sounddevice CallbackFlags attributes counted by the capture callback
+STATUS_FLAGS = ("input_overflow", "input_underflow", "output_overflow", "output_underflow", "priming_output")
+
+
+class FrameRingBuffer:
+    """Preallocated single-producer/single-consumer ring buffer of mono samples.
+
+    The PortAudio callback writes into it and the capture worker drains it. When
+    the buffer is full, incoming frames are dropped and counted instead of
+    blocking the audio thread.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=dtype)
+        self.read_pos = 0
+        self.write_pos = 0
+        self.size = 0
+        self.dropped_frames = 0
+        self.high_water = 0
+        self.lock = threading.Lock()
+
+    def write(self, samples):
+        """Copy samples into the ring. Returns the number of samples dropped."""
+        with self.lock:
+            free = self.capacity - self.size
+            count = min(len(samples), free)
+            dropped = len(samples) - count
+            if count:
+                first = min(count, self.capacity - self.write_pos)
+                self.buffer[self.write_pos:self.write_pos + first] = samples[:first]
+                if count > first:
+                    self.buffer[:count - first] = samples[first:count]
+                self.write_pos = (self.write_pos + count) % self.capacity
+                self.size += count
+                self.high_water = max(self.high_water, self.size)
+            self.dropped_frames += dropped
+            return dropped
+
+    def read_into(self, consume):
+        """Drain everything currently buffered by passing at most two views to ``consume``.
+
+        ``consume`` runs outside the lock, so the callback is never held up by it:
+        the producer only writes into free space, never into the samples being read.
+        The views are only valid during the call; ``consume`` must copy them.
+        Returns the number of samples drained.
+        """
+        with self.lock:
+            start, count = self.read_pos, self.size
+        if count:
+            first = min(count, self.capacity - start)
+            consume(self.buffer[start:start + first])
+            if count > first:
+                consume(self.buffer[:count - first])
+            with self.lock:
+                self.read_pos = (start + count) % self.capacity
+                self.size -= count
+        return count
+
+    def clear(self):
+        with self.lock:
+            self.read_pos = self.write_pos = self.size = 0
+
+
+class AudioStore:
+    """Append-only int16 sample store made of fixed-size preallocated blocks.
+
+    Samples are written exactly once. Blocks are never reallocated or moved, so
+    ``view`` returns zero-copy slices for any span within one block (only a span
+    straddling a block boundary is copied). Blocks that are no longer needed can be
+    released; views handed out earlier keep their block alive until dropped.
+    """
+
+    def __init__(self, block_samples, dtype=np.int16):
+        self.block_samples = int(block_samples)
+        self.dtype = dtype
+        self.blocks = []
+        self.released = 0  # Blocks before this index have been released
+        self.length = 0
+
+    def append(self, samples):
+        offset = 0
+        while offset < len(samples):
+            block_index, position = divmod(self.length, self.block_samples)
+            if block_index == len(self.blocks):
+                self.blocks.append(np.empty(self.block_samples, dtype=self.dtype))
+            count = min(len(samples) - offset, self.block_samples - position)
+            self.blocks[block_index][position:position + count] = samples[offset:offset + count]
+            self.length += count
+            offset += count
+
+    def view(self, start, end):
+        """Samples [start, end) as an array (a view when the span lies in one block)."""
+        first_block, first_position = divmod(start, self.block_samples)
+        last_block = (end - 1) // self.block_samples
+        if first_block == last_block:
+            return self.blocks[first_block][first_position:first_position + end - start]
+        return np.concatenate(list(self.iter_blocks(start, end)))
+
+    def iter_blocks(self, start=0, end=None):
+        """Yield zero-copy views covering [start, end) block by block."""
+        end = self.length if end is None else end
+        position = start
+        while position < end:
+            block_index, offset = divmod(position, self.block_samples)
+            count = min(end - position, self.block_samples - offset)
+            yield self.blocks[block_index][offset:offset + count]
+            position += count
+
+    def release_before(self, index):
+        """Release the blocks that lie entirely before sample ``index``."""
+        last = min(index // self.block_samples, len(self.blocks))
+        for block_index in range(self.released, last):
+            self.blocks[block_index] = None
+        self.released = max(self.released, last)
+
+    def clear(self):
+        self.blocks = []
+        self.released = 0
+        self.length = 0
+
+    @property
+    def allocated_bytes(self):
+        held = sum(1 for block in self.blocks if block is not None)
+        return held * self.block_samples * np.dtype(self.dtype).itemsize
+
+
+class EnergyVAD:
+    """Frame-level speech detector on RMS energy with an adaptive noise floor.
+
+    Samples are split into fixed frames (a partial frame is carried over to the
+    next call) and the RMS of all frames is computed at once. The noise floor is
+    the quietest frame seen within the last ``noise_window`` seconds; it drops at
+    once but rises at most ``rise_db`` per second, so it follows the room without
+    being pulled up by continuous speech.
+    """
+
+    def __init__(self, sample_rate, frame_seconds=VAD_FRAME_SECONDS, min_dbfs=VAD_MIN_DBFS,
+                 speech_ratio=VAD_SPEECH_RATIO, noise_window=VAD_NOISE_WINDOW_SECONDS,
+                 rise_db=VAD_NOISE_RISE_DB_PER_SECOND):
+        self.frame_length = max(1, int(sample_rate * frame_seconds))
+        self.frame_seconds = frame_seconds
+        self.rise_db = rise_db
+        self.min_rms = 32768 * 10 ** (min_dbfs / 20)
+        self.speech_ratio = speech_ratio
+        self.window_frames = max(1, int(noise_window / frame_seconds))
+        self.minima = deque()  # (frame index, quietest RMS of one call)
+        self.frames = 0
+        self.noise_floor = None
+        self.pending = np.zeros(0, dtype=np.int16)
+
+    def process(self, samples):
+        """Return one speech flag per complete frame now available."""
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+        usable = len(samples) - len(samples) % self.frame_length
+        self.pending = samples[usable:].copy()
+        if not usable:
+            return np.zeros(0, dtype=bool)
+        frames = samples[:usable].reshape(-1, self.frame_length).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        self.frames += len(rms)
+        self.minima.append((self.frames, float(rms.min())))
+        while self.minima[0][0] <= self.frames - self.window_frames and len(self.minima) > 1:
+            self.minima.popleft()
+        window_floor = min(minimum for _, minimum in self.minima)
+        if self.noise_floor is None or window_floor <= self.noise_floor:
+            self.noise_floor = window_floor
+        else:
+            rise = 10 ** (self.rise_db * len(rms) * self.frame_seconds / 20)
+            self.noise_floor = min(window_floor, max(self.noise_floor, 1.0) * rise)
+        return rms > max(self.min_rms, self.noise_floor * self.speech_ratio)
+
+
+class IncrementalWavWriter:
+    """Mono 16-bit WAV file appended to while recording.
+
+    The header is written up front with zero sizes and patched by ``close``; if the
+    process dies first, ``recover_wav`` fixes the sizes from the file length.
+    """
+
+    def __init__(self, path, sample_rate):
+        self.path = path
+        self.file = open(path, "wb")
+        self.wav = wave.open(self.file, "wb")
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(sample_rate)
+        self.wav.writeframesraw(b"")  # Write the header now so a partial file is parseable
+        self.frames = 0
+
+    def write(self, samples):
+        self.wav.writeframesraw(samples)
+        self.frames += len(samples)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.wav.close()  # Patches the RIFF and data chunk sizes
+        self.file.close()
+
+
+def recover_wav(path):
+    """Patch the header of a WAV file that was not closed (e.g. after a crash).
+
+    Returns True if the RIFF and data chunk sizes were rewritten.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return False
+        position = 12
+        while True:
+            f.seek(position)
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return False
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"data":
+                break
+            position += 8 + chunk_size + (chunk_size & 1)
+        data_size = file_size - position - 8
+        data_size -= data_size % 2
+        if data_size <= 0:
+            return False  # Nothing was captured, there is no audio to recover
+        # Only unfinished headers (zero or past-the-end sizes) are touched
+        if chunk_size != 0 and chunk_size <= data_size:
+            return False
+        f.seek(4)
+        f.write(struct.pack("<I", position + data_size))
+        f.seek(position + 4)
+        f.write(struct.pack("<I", data_size))
+    return True
+
+
+def recover_partial_recordings(root="recordings"):
+    """Repair recordings left unfinished by a crash. Returns the repaired paths."""
+    recovered = []
+    if not os.path.isdir(root):
+        return recovered
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.startswith("recording_") and filename.endswith(".wav"):
+                path = os.path.join(directory, filename)
+                try:
+                    if recover_wav(path):
+                        recovered.append(path)
+                        logger.warning(f"Recovered partially written recording {path}")
+                except OSError as e:
+                    logger.error(f"Could not recover {path}: {str(e)}")
+    return recovered
+
+
+class CapturePipeline:
+    """Bounded producer/consumer pipeline for live recording.
+
+    The sounddevice callback (opened with dtype int16) only copies frames into a
+    ring buffer. A cutter task on the server event loop drains the ring into an
+    AudioStore, appends the new frames to the recording WAV on disk, and cuts
+    fixed-length segments, as views into the store, onto a bounded queue, which a
+    transcriber task consumes
+    by awaiting ``on_segment(segment_audio, segment_number, start_time)``, where
+    ``start_time`` is the segment offset in seconds from the start of the recording.
+    Store blocks are released once written to disk and cut, so memory stays flat
+    however long the recording runs.
+
+    With ``vad`` enabled, segments are cut on pauses (at most ``segment_duration``
+    long) and silence is skipped: it is still written to the recording but never
+    sent for transcription. With ``adaptive`` enabled, ``segment_duration`` is
+    re-tuned after every segment between ``min_duration`` and ``max_duration``
+    from the upstream latency and the queue depth.
+    """
+
+    def __init__(self, sample_rate, segment_duration, on_segment, recording_path,
+                 buffer_seconds=30, max_pending_segments=4, poll_interval=0.1, block_seconds=60, vad=VAD_ENABLED,
+                 adaptive=ADAPTIVE_SEGMENTS, min_duration=SEGMENT_MIN_SECONDS, max_duration=SEGMENT_MAX_SECONDS):
+        self.sample_rate = sample_rate
+        self.recording_path = recording_path
+        self.writer = None
+        self.written_samples = 0
+        self.segment_duration = segment_duration
+        self.on_segment = on_segment
+        self.poll_interval = poll_interval
+        self.ring = FrameRingBuffer(sample_rate * buffer_seconds)
+        self.segments = asyncio.Queue(maxsize=max_pending_segments)
+        self.store = AudioStore(sample_rate * block_seconds)
+        self.segment_start = 0  # Store offset where the current segment begins
+        self.segment_counter = 0
+        self.running = False
+        self.cutter_task = None
+        self.transcriber_task = None
+        # PortAudio status flags reported to the callback, counted there and logged by the cutter task
+        self.status_flags = dict.fromkeys(STATUS_FLAGS, 0)
+        self.logged_status_flags = dict(self.status_flags)
+        self.dropped_segments = 0
+        self.processed_segments = 0
+        self.failed_segments = 0
+        self.last_segment_latency = None
+        self.vad = EnergyVAD(sample_rate) if vad else None
+        self.speech_flags = np.zeros(0, dtype=bool)  # One flag per VAD frame from segment_start
+        self.skipped_samples = 0
+        self.skipped_spans = 0  # Contiguous stretches of skipped audio
+        self.skipping = False
+        self.cut_reasons = {"pause": 0, "max_length": 0, "final": 0}
+        self.adaptive = adaptive
+        self.min_duration = min(min_duration, segment_duration)
+        self.max_duration = max(max_duration, segment_duration)
+        self.load_average = None  # Moving average of transcription seconds per audio second
+        self.segment_resizes = 0
+
+    def audio_callback(self, indata, frames, time_info, status):
+        """sounddevice callback: never blocks, never allocates beyond the ring copy (no I/O here)."""
+        if status:
+            for flag in STATUS_FLAGS:
+                if getattr(status, flag):
+                    self.status_flags[flag] += 1
+        self.ring.write(indata[:, 0])
+
+    async def start(self):
+        self.writer = IncrementalWavWriter(self.recording_path, self.sample_rate)
+        self.running = True
+        self.cutter_task = asyncio.create_task(self._cut_segments())
+        self.transcriber_task = asyncio.create_task(self._transcribe_segments())
+
+    async def stop(self):
+        """Flush the remaining audio as a final segment and wait for the queue to drain."""
+        self.running = False
+        if self.cutter_task:
+            await self.cutter_task
+        self._log_status_flags()
+        self._drain_ring()
+        if self.store.length > self.segment_start:
+            if self.vad and self._speech_frames(len(self.speech_flags)) < self._frames(VAD_MIN_SPEECH_SECONDS):
+                self._skip(self.store.length - self.segment_start)
+            else:
+                self.cut_reasons["final"] += 1
+                self._emit_segment()
+        if self.writer:
+            self.writer.close()
+        await self.segments.put(None)
+        if self.transcriber_task:
+            await self.transcriber_task
+
+    def _drain_ring(self):
+        self.ring.read_into(self.store.append)
+        if self.store.length > self.written_samples:
+            new_flags = []
+            for block in self.store.iter_blocks(self.written_samples, self.store.length):
+                self.writer.write(block)
+                if self.vad:
+                    new_flags.append(self.vad.process(block))
+            if new_flags:
+                self.speech_flags = np.concatenate([self.speech_flags] + new_flags)
+            self.written_samples = self.store.length
+            self.writer.flush()
+
+    def _frames(self, seconds):
+        return int(seconds * self.sample_rate) // self.vad.frame_length
+
+    def _speech_frames(self, count):
+        return int(np.count_nonzero(self.speech_flags[:count]))
+
+    def _advance(self, samples):
+        """Move the start of the current segment forward and release what lies before it."""
+        self.segment_start += samples
+        self.store.release_before(self.segment_start)
+        if self.vad:
+            self.speech_flags = self.speech_flags[samples // self.vad.frame_length:]
+
+    def _skip(self, samples):
+        """Drop audio from the live transcription (it stays in the recording)."""
+        self._advance(samples)
+        self.skipped_samples += samples
+        if not self.skipping:
+            self.skipped_spans += 1
+            self.skipping = True
+
+    def _emit_segment(self, end=None):
+        end = self.store.length if end is None else end
+        segment_audio = self.store.view(self.segment_start, end)
+        start_time = self.segment_start / self.sample_rate
+        self._advance(end - self.segment_start)
+        self.skipping = False
+        self.segment_counter += 1
+        try:
+            self.segments.put_nowait((self.segment_counter, start_time, segment_audio))
+        except asyncio.QueueFull:
+            # The audio is still in the full recording; only the live preview loses it.
+            self.dropped_segments += 1
+            logger.warning(f"Segment queue full, dropping live segment {self.segment_counter}")
+
+    def _log_status_flags(self):
+        """Log the audio status flags raised since the last call (off the audio thread)."""
+        for flag, count in self.status_flags.items():
+            new = count - self.logged_status_flags[flag]
+            if new:
+                logger.warning(f"Audio stream reported {flag.replace('_', ' ')} {new} time(s)")
+                self.logged_status_flags[flag] = count
+
+    async def _cut_segments(self):
+        while self.running:
+            await asyncio.sleep(self.poll_interval)
+            self._log_status_flags()
+            self._drain_ring()
+            if self.vad:
+                self._cut_on_pauses()
+            elif self.store.length - self.segment_start >= self.sample_rate * self.segment_duration:
+                self._emit_segment()
+
+    def _cut_on_pauses(self):
+        """Skip leading silence and cut the current segment at a pause or at the maximum length."""
+        frame_length = self.vad.frame_length
+        pause_frames = self._frames(VAD_PAUSE_SECONDS)
+        preroll_frames = self._frames(VAD_PREROLL_SECONDS)
+        min_frames = self._frames(min(VAD_MIN_SEGMENT_SECONDS, self.segment_duration))
+        max_frames = self._frames(self.segment_duration)
+        while True:
+            flags = self.speech_flags
+            speech = np.flatnonzero(flags)
+            if not len(speech):
+                # Only silence so far: drop it, keeping a short pre-roll before the next word
+                if len(flags) > pause_frames + preroll_frames:
+                    self._skip((len(flags) - preroll_frames) * frame_length)
+                return
+            if speech[0] > pause_frames + preroll_frames:
+                self._skip((speech[0] - preroll_frames) * frame_length)
+                continue
+            trailing_silence = len(flags) - 1 - speech[-1]
+            if trailing_silence >= pause_frames:
+                # Even after a short utterance, which would otherwise be held until max_frames
+                cut = speech[-1] + 1 + pause_frames // 2
+                reason = "pause"
+            elif len(flags) >= max_frames:
+                cut = self._longest_pause(speech, min_frames, max_frames) or max_frames
+                reason = "max_length"
+            else:
+                return
+            if self._speech_frames(cut) < self._frames(VAD_MIN_SPEECH_SECONDS):
+                self._skip(cut * frame_length)
+            else:
+                self.cut_reasons[reason] += 1
+                self._emit_segment(self.segment_start + cut * frame_length)
+
+    @staticmethod
+    def _longest_pause(speech, min_frames, max_frames):
+        """Frame in the middle of the longest gap between speech frames within [min_frames, max_frames)."""
+        speech = speech[speech < max_frames]
+        gaps = np.diff(speech)
+        if not len(gaps):
+            return None
+        middles = speech[:-1] + gaps // 2
+        candidates = (gaps > 1) & (middles >= min_frames)
+        if not candidates.any():
+            return None
+        best = np.argmax(np.where(candidates, gaps, 0))
+        return int(middles[best])
+
+    async def _transcribe_segments(self):
+        while True:
+            item = await self.segments.get()
+            if item is None:
+                break
+            segment_number, start_time, segment_audio = item
+            started = time.perf_counter()
+            failed = False
+            try:
+                await self.on_segment(segment_audio, segment_number, start_time)
+                self.processed_segments += 1
+            except Exception as e:
+                self.failed_segments += 1
+                failed = True
+                logger.error(f"Error transcribing segment {segment_number}: {str(e)}")
+            self.last_segment_latency = time.perf_counter() - started
+            if self.adaptive and self.running:
+                self._adapt_segment_duration(len(segment_audio) / self.sample_rate, failed)
+
+    def _adapt_segment_duration(self, audio_seconds, failed):
+        """Lengthen segments when transcription falls behind, shorten them when it has headroom.
+
+        Longer segments mean fewer requests (better under rate limits and more
+        context for Whisper); shorter ones mean text appears sooner.
+        """
+        load = self.last_segment_latency / max(audio_seconds, 0.1)
+        self.load_average = load if self.load_average is None else 0.7 * self.load_average + 0.3 * load
+        backlog = self.segments.qsize()
+        duration = self.segment_duration
+        if failed or backlog or self.load_average > SEGMENT_TARGET_LOAD:
+            duration = min(self.max_duration, duration * (1.5 if failed or backlog > 1 else 1.25))
+        elif self.load_average < SEGMENT_TARGET_LOAD / 2:
+            duration = max(self.min_duration, duration * 0.9)
+        if duration != self.segment_duration:
+            logger.debug(f"Live segment length {self.segment_duration:.1f}s -> {duration:.1f}s "
+                         f"(load {self.load_average:.2f}, backlog {backlog})")
+            self.segment_duration = duration
+            self.segment_resizes += 1
+
+    @property
+    def complete(self):
+        """True when every emitted segment was transcribed live."""
+        return not self.dropped_segments and not self.failed_segments
+
+    def get_memory_usage(self):
+        """Bytes held by the capture buffers of this recording."""
+        return {
+            "ring_buffer_bytes": self.ring.buffer.nbytes,
+            "store_allocated_bytes": self.store.allocated_bytes,
+            "total_bytes": self.ring.buffer.nbytes + self.store.allocated_bytes,
+        }
+
+    def get_metrics(self):
+        """Backpressure and throughput counters for the current recording."""
+        return {
+            "running": self.running,
+            "recorded_seconds": self.store.length / self.sample_rate,
+            "written_bytes": self.written_samples * 2,
+            "memory": self.get_memory_usage(),
+            "ring_buffer_fill": self.ring.size,
+            "ring_buffer_capacity": self.ring.capacity,
+            "ring_buffer_high_water": self.ring.high_water,
+            "dropped_frames": self.ring.dropped_frames,
+            "input_overflows": self.status_flags["input_overflow"],
+            "status_flags": dict(self.status_flags),
+            "segment_queue_depth": self.segments.qsize(),
+            "segment_queue_capacity": self.segments.maxsize,
+            "segments_emitted": self.segment_counter,
+            "segments_processed": self.processed_segments,
+            "segments_failed": self.failed_segments,
+            "segments_dropped": self.dropped_segments,
+            "last_segment_latency": self.last_segment_latency,
+            "segment_duration": self.segment_duration,
+            "segment_duration_bounds": [self.min_duration, self.max_duration] if self.adaptive else None,
+            "segment_load_average": self.load_average,
+            "segment_resizes": self.segment_resizes,
+            "vad": self.get_vad_metrics(),
+        }
+
+    def get_vad_metrics(self):
+        """How much audio voice-activity detection kept out of the live transcription."""
+        if not self.vad:
+            return {"enabled": False}
+        recorded = self.store.length / self.sample_rate
+        skipped = self.skipped_samples / self.sample_rate
+        noise_floor = self.vad.noise_floor
+        return {
+            "enabled": True,
+            "skipped_seconds": skipped,
+            "skipped_ratio": skipped / recorded if recorded else None,
+            "skipped_spans": self.skipped_spans,
+            "noise_floor_dbfs": 20 * np.log10(max(noise_floor, 1) / 32768) if noise_floor is not None else None,
+            "cut_reasons": self.cut_reasons,
+        }
@@ -1,10 +1,21 @@
 
 # chat.py
-from groq import Groq
 from fastapi import HTTPException
+from upstream import upstream
+from retrieval import retrieve_context
+from answer_cache import answer_cache, refers_back
+import os
+import hashlib
 import json
+import logging
 
-client = Groq()
+logger = logging.getLogger(__name__)
+
+# History sent with each question: the last CHAT_HISTORY_ENTRIES messages verbatim (each cut to
+# CHAT_HISTORY_ENTRY_CHARS), earlier ones reduced to the questions asked
+CHAT_HISTORY_ENTRIES = int(os.environ.get("CHAT_HISTORY_ENTRIES", "6"))
+CHAT_HISTORY_ENTRY_CHARS = int(os.environ.get("CHAT_HISTORY_ENTRY_CHARS", "1500"))
+CHAT_EARLIER_QUESTIONS_CHARS = int(os.environ.get("CHAT_EARLIER_QUESTIONS_CHARS", "1000"))
 
 system_prompt = """
 Vous êtes un expert en audit spécialisé dans tous les types d'audits (qualité, sécurité, environnement, financier, etc.).
@@ -14,12 +25,10 @@ Règles à suivre :
 1. Utilisez un langage clair et professionnel adapté aux audits.
 2. Tenez compte de l'historique de la conversation pour fournir des réponses cohérentes.
 3. Si une question nécessite des informations manquantes, demandez des précisions.
-4. Basez vos réponses sur les informations d'audit suivantes :
-   - Transcription : {transcription}
+4. Basez vos réponses sur les informations d'audit suivantes, ainsi que sur les extraits de la transcription et l'historique de la conversation fournis avec chaque question :
    - Résumé : {summary}
    - Non-conformités : {non_conformities}
    - Processus : {processes}
-   - Historique de la conversation : {chat_history}
 5.repondre avec la language de la derniere question posée.
 6. Si la question est hors sujet ou ne peut pas être traitée, indiquez "Je ne sais pas répondre à cette question."
 
@@ -31,25 +40,136 @@ Exemples de questions que vous pouvez traiter :
 - "Quelles sont les recommandations pour améliorer la conformité ?"
 """
 
-async def handle_chat_query(question: str, context: dict, chat_history: list):
+# Per-question part of the prompt, sent after the system prefix so the prefix stays identical across turns
+turn_prompt = """Extraits pertinents de la transcription :
+{transcription}
+
+Historique de la conversation :
+{chat_history}"""
+
+def _shorten(text, limit):
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " [...]"
+
+def format_history(recent: list, earlier_questions=()):
+    """History text: the earlier questions asked (most recent kept), then the recent messages."""
+    lines = []
+    if earlier_questions:
+        asked = " | ".join(earlier_questions)
+        if len(asked) > CHAT_EARLIER_QUESTIONS_CHARS:
+            # Keep the most recent questions
+            asked = "[...] " + asked[-CHAT_EARLIER_QUESTIONS_CHARS:].split(" ", 1)[-1]
+        lines.append("Questions précédentes : " + asked)
+    lines += [_shorten(entry, CHAT_HISTORY_ENTRY_CHARS) for entry in recent]
+    return "\n".join(lines)
+
+def question_of(entry):
+    """The question of a "User: ..." history entry, or None for an answer."""
+    return entry[len("User:"):].strip() if entry.startswith("User:") else None
+
+def render_system_prefix(context: dict):
+    return system_prompt.format(
+        summary=context.get("summary", ""),
+        non_conformities=context.get("non_conformities", ""),
+        processes=context.get("processes", ""),
+    )
+
+def turn_messages(question: str, excerpts: str, history: str):
+    return [
+        {"role": "system", "content": turn_prompt.format(transcription=excerpts, chat_history=history)},
+        {"role": "user", "content": question}
+    ]
+
+def build_chat_messages(question: str, context: dict, chat_history: list):
+    """Messages for a stateless chat turn: the last CHAT_HISTORY_ENTRIES messages in full, earlier
+    ones reduced to the questions asked, and only the transcript passages relevant to the question."""
+    recent = chat_history[-CHAT_HISTORY_ENTRIES:] if CHAT_HISTORY_ENTRIES > 0 else []
+    earlier = chat_history[:len(chat_history) - len(recent)]
+    questions = [asked for asked in map(question_of, chat_history) if asked]
+    # The previous question is part of the query so follow-ups find the same passages
+    excerpts = retrieve_context(context.get("transcription", ""), " ".join([question] + questions[-1:]))
+    history = format_history(recent, [asked for asked in map(question_of, earlier) if asked])
+    return [{"role": "system", "content": render_system_prefix(context)}] + turn_messages(question, excerpts, history)
+
+async def complete_chat(messages: list):
+    try:
+        response = await upstream.chat(messages=messages, temperature=0.3)
+        return response.choices[0].message.content
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+
+async def stream_chat(messages: list, on_answer=None):
+    """Server-Sent Events of the answer: one "token" event per delta, then "done" (or "error").
+
+    ``on_answer`` is called with the complete answer before "done" is sent.
+    """
+    parts = []
     try:
-        formatted_context = "\n".join([f"{k}: {v}" for k, v in context.items()])
-        formatted_history = "\n".join(chat_history)
-
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt.format(
-                    transcription=context.get("transcription", ""),
-                    summary=context.get("summary", ""),
-                    non_conformities=context.get("non_conformities", ""),
-                    processes=context.get("processes", ""),
-                    chat_history=formatted_history
-                )},
-                {"role": "user", "content": question}
-            ],
-            model="llama3-70b-8192",
-            temperature=0.3,
-        )
-        return {"response": response.choices[0].message.content}
+        async for delta in upstream.chat_stream(messages=messages, temperature=0.3, tag="chat"):
+            parts.append(delta)
+            yield f"event: token\ndata: {json.dumps({'text': delta})}\n\n"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
\ No newline at end of file
+        # The response has already started, so the error is reported in-band
+        logger.error(f"Chat stream error: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': f'Chat error: {str(e)}'})}\n\n"
+        return
+    answer = "".join(parts)
+    if on_answer:
+        on_answer(answer)
+    yield f"event: done\ndata: {json.dumps({'response': answer})}\n\n"
+
+def context_hash(context: dict):
+    """Hash of an audit context, identifying it in the answer cache."""
+    return hashlib.sha256(json.dumps(context, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def cache_key(context_key: str, question: str, has_history: bool):
+    """The answer cache context for ``question``, or None when its answer depends on the conversation."""
+    if has_history and refers_back(question):
+        answer_cache.skip_follow_up()
+        return None
+    return context_key
+
+async def answer_question(question: str, build_messages, context_key: str, has_history=False):
+    """Answer from the cache for this context, or ask the model (messages are only built on a miss).
+
+    Follow-ups referring back to earlier turns ("ce processus") bypass the cache.
+    """
+    context_key = cache_key(context_key, question, has_history)
+    cached = answer_cache.get(context_key, question) if context_key else None
+    if cached is not None:
+        return {"response": cached, "cached": True}
+    answer = await complete_chat(build_messages())
+    if context_key:
+        answer_cache.set(context_key, question, answer)
+    return {"response": answer}
+
+async def stream_answer(question: str, build_messages, context_key: str, has_history=False, on_answer=None):
+    """Streamed ``answer_question``: a cached answer is sent as one "token" event before "done"."""
+    context_key = cache_key(context_key, question, has_history)
+    cached = answer_cache.get(context_key, question) if context_key else None
+    if cached is not None:
+        if on_answer:
+            on_answer(cached)
+        yield f"event: token\ndata: {json.dumps({'text': cached})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'response': cached, 'cached': True})}\n\n"
+        return
+
+    def store(answer):
+        if context_key:
+            answer_cache.set(context_key, question, answer)
+        if on_answer:
+            on_answer(answer)
+
+    async for event in stream_chat(build_messages(), on_answer=store):
+        yield event
+
+async def handle_chat_query(question: str, context: dict, chat_history: list):
+    return await answer_question(
+        question, lambda: build_chat_messages(question, context, chat_history), context_hash(context),
+        has_history=bool(chat_history),
+    )
+
+def stream_chat_query(question: str, context: dict, chat_history: list):
+    return stream_answer(
+        question, lambda: build_chat_messages(question, context, chat_history), context_hash(context),
+        has_history=bool(chat_history),
+    )
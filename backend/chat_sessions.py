@@ -0,0 +1,145 @@
+# chat_sessions.py
+import os
+import asyncio
+import time
+import uuid
+from fastapi import HTTPException
+from chat import render_system_prefix, turn_messages, format_history, question_of, context_hash
+from retrieval import get_index, RETRIEVAL_TOP_K
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_CHAT_SESSIONS = int(os.environ.get("MAX_CHAT_SESSIONS", "64"))
+CHAT_SESSION_IDLE_TIMEOUT = float(os.environ.get("CHAT_SESSION_IDLE_TIMEOUT", "3600"))
+# Approximate tokens of history sent with each question (older messages are reduced to their question)
+CHAT_HISTORY_TOKENS = int(os.environ.get("CHAT_HISTORY_TOKENS", "1500"))
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for Llama 3 on French and English)."""
+    return len(text) // 4 + 1
+
+
+class ChatSession:
+    """Audit context and conversation of one chat, held server-side.
+
+    The context is stored once: the system prefix is rendered and the transcript
+    indexed when it is set, so each turn only carries the new question.
+    """
+
+    def __init__(self, session_id, context=None, chat_history=()):
+        self.session_id = session_id
+        self.history = []  # "User: ..." / "Assistant: ..." entries within CHAT_HISTORY_TOKENS
+        self.history_tokens = 0
+        self.earlier_questions = []  # Questions of the messages dropped from the history
+        self.turns = 0
+        self.lock = asyncio.Lock()  # One turn at a time, so the history stays in order
+        self.created = time.time()
+        self.last_active = time.monotonic()
+        self.set_context(context or {})
+        for entry in chat_history:
+            self._append(entry)
+
+    def set_context(self, context):
+        self.context_hash = context_hash(context)  # Shared with stateless chat on the same context
+        self.system_prefix = render_system_prefix(context)
+        transcription = context.get("transcription", "")
+        self.index = get_index(transcription) if transcription else None
+        self.transcription_chars = len(transcription)
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def _append(self, entry):
+        self.history.append(entry)
+        self.history_tokens += estimate_tokens(entry)
+        while self.history_tokens > CHAT_HISTORY_TOKENS and len(self.history) > 1:
+            dropped = self.history.pop(0)
+            self.history_tokens -= estimate_tokens(dropped)
+            question = question_of(dropped)
+            if question:
+                self.earlier_questions.append(question)
+
+    def messages(self, question):
+        """Messages for ``question``: cached system prefix, relevant passages and the history window."""
+        previous = [asked for asked in map(question_of, self.history) if asked][-1:] or self.earlier_questions[-1:]
+        excerpts = self.index.context(" ".join([question] + previous), RETRIEVAL_TOP_K) if self.index else ""
+        history = format_history(self.history, self.earlier_questions)
+        return [{"role": "system", "content": self.system_prefix}] + turn_messages(question, excerpts, history)
+
+    @property
+    def has_history(self):
+        return bool(self.history or self.earlier_questions)
+
+    def add_turn(self, question, answer):
+        self._append(f"User: {question}")
+        self._append(f"Assistant: {answer}")
+        self.turns += 1
+
+    def get_info(self):
+        return {
+            "chat_session_id": self.session_id,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created)),
+            "turns": self.turns,
+            "history": self.history,
+            "history_tokens": self.history_tokens,
+            "earlier_questions": len(self.earlier_questions),
+            "transcription_chars": self.transcription_chars,
+            "passages": len(self.index.passages) if self.index else 0,
+        }
+
+
+class ChatSessionStore:
+    """Chat sessions keyed by id; the least recently used idle one is dropped when MAX_CHAT_SESSIONS is reached."""
+
+    def __init__(self, max_sessions=MAX_CHAT_SESSIONS, idle_timeout=CHAT_SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.evicted = 0
+
+    def create(self, context=None, chat_history=()):
+        self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            # A session answering a question is never dropped under its caller
+            idle = [session_id for session_id, session in self.sessions.items() if not session.lock.locked()]
+            if not idle:
+                raise HTTPException(status_code=429, detail=f"Too many active chat sessions (max {self.max_sessions})")
+            oldest = min(idle, key=lambda session_id: self.sessions[session_id].last_active)
+            del self.sessions[oldest]
+            self.evicted += 1
+            logger.debug(f"Evicted chat session {oldest}")
+        session = ChatSession(uuid.uuid4().hex, context, chat_history)
+        self.sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        session.touch()
+        return session
+
+    def close(self, session_id):
+        if self.sessions.pop(session_id, None) is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+
+    def evict_idle(self):
+        now = time.monotonic()
+        idle = [
+            session_id for session_id, session in self.sessions.items()
+            if not session.lock.locked() and now - session.last_active > self.idle_timeout
+        ]
+        for session_id in idle:
+            del self.sessions[session_id]
+            self.evicted += 1
+        return len(idle)
+
+    def get_metrics(self):
+        return {
+            "active_sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "evicted_sessions": self.evicted,
+            "turns": sum(session.turns for session in self.sessions.values()),
+        }
@@ -0,0 +1,198 @@
+# chunking.py
+import os
+import asyncio
+import shutil
+import tempfile
+import wave
+import numpy as np
+from audio_codec import decode_with_soundfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Long-audio chunking configuration (overridable through the environment)
+CHUNK_SECONDS = float(os.environ.get("TRANSCRIPTION_CHUNK_SECONDS", "300"))
+CHUNK_OVERLAP = float(os.environ.get("TRANSCRIPTION_CHUNK_OVERLAP", "2"))
+SILENCE_SEARCH_SECONDS = float(os.environ.get("TRANSCRIPTION_SILENCE_SEARCH", "15"))
+CHUNK_FANOUT = int(os.environ.get("TRANSCRIPTION_FANOUT", "4"))
+# Compressed uploads below this size are sent to Whisper as-is without decoding
+CHUNK_MIN_BYTES = int(os.environ.get("TRANSCRIPTION_CHUNK_MIN_BYTES", str(20 * 1024 * 1024)))
+FRAME_SECONDS = 0.02
+DECODE_SAMPLE_RATE = 16000
+
+
+def is_pcm_wav(path):
+    """True if the file is a 16-bit PCM WAV that can be read with the wave module."""
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getsampwidth() == 2
+    except (wave.Error, EOFError):
+        return False
+
+
+def wav_duration(path):
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+async def decode_to_wav(audio_path, output_path, sample_rate=DECODE_SAMPLE_RATE):
+    """Decode any ffmpeg-readable file to a mono 16-bit WAV. Returns None if it cannot be decoded."""
+    if not shutil.which("ffmpeg"):
+        # FLAC/Ogg recordings can still be decoded through libsndfile, at their native rate
+        return await decode_with_soundfile(audio_path, output_path)
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", audio_path,
+        "-ac", "1", "-ar", str(sample_rate), "-sample_fmt", "s16", output_path,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        logger.error(f"ffmpeg failed to decode {audio_path}: {stderr.decode(errors='replace')}")
+        return None
+    return output_path
+
+
+def frame_energies(path, frame_seconds=FRAME_SECONDS, block_seconds=60):
+    """RMS energy per frame, computed by streaming through the WAV one block at a time."""
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        frame_length = max(1, int(wf.getframerate() * frame_seconds))
+        block_length = frame_length * max(1, int(block_seconds / frame_seconds))
+        energies = []
+        while True:
+            data = wf.readframes(block_length)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels).mean(axis=1)
+            usable = len(samples) - len(samples) % frame_length
+            if usable:
+                frames = samples[:usable].reshape(-1, frame_length)
+                energies.append(np.sqrt(np.mean(frames * frames, axis=1)))
+            if usable < len(samples):
+                tail = samples[usable:]
+                energies.append(np.array([np.sqrt(np.mean(tail * tail))]))
+    return np.concatenate(energies) if energies else np.zeros(0)
+
+
+def plan_chunks(energies, duration, chunk_seconds=CHUNK_SECONDS, search_seconds=SILENCE_SEARCH_SECONDS,
+                frame_seconds=FRAME_SECONDS):
+    """Split [0, duration) into consecutive (start, end) spans of at most ``chunk_seconds``.
+
+    Each cut is placed on the quietest frame within ``search_seconds`` before the
+    target boundary, so chunks tend to end on pauses rather than mid-word.
+    """
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds:
+        target = cuts[-1] + chunk_seconds
+        low = max(cuts[-1] + chunk_seconds / 2, target - search_seconds)
+        low_index = int(low / frame_seconds)
+        high_index = min(int(target / frame_seconds), len(energies))
+        if high_index > low_index:
+            cut = (low_index + int(np.argmin(energies[low_index:high_index]))) * frame_seconds
+        else:
+            cut = target
+        cuts.append(cut)
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def write_wav_slice(source_path, output_path, start, end):
+    """Copy the [start, end) seconds of a WAV file into a new WAV file."""
+    with wave.open(source_path, "rb") as src:
+        rate = src.getframerate()
+        first = int(start * rate)
+        last = min(int(end * rate), src.getnframes())
+        src.setpos(first)
+        data = src.readframes(last - first)
+        with wave.open(output_path, "wb") as dst:
+            dst.setnchannels(src.getnchannels())
+            dst.setsampwidth(src.getsampwidth())
+            dst.setframerate(rate)
+            dst.writeframes(data)
+
+
+def _normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+def merge_chunk_segments(chunk_results):
+    """Merge per-chunk Whisper segments into one list with absolute timestamps.
+
+    Args:
+        chunk_results: list of (core_start, core_end, read_start, segments) where
+            segments are relative to ``read_start`` and [core_start, core_end) is the
+            part of the timeline the chunk owns (the rest is overlap)
+    """
+    merged = []
+    last_index = len(chunk_results) - 1
+    for index, (core_start, core_end, read_start, segments) in enumerate(chunk_results):
+        for segment in segments:
+            start = segment["start"] + read_start
+            end = segment["end"] + read_start
+            midpoint = (start + end) / 2
+            # Segments in the overlap belong to the chunk whose core contains their midpoint
+            if midpoint < core_start or (midpoint >= core_end and index != last_index):
+                continue
+            if merged and _normalize_text(merged[-1]["text"]) == _normalize_text(segment["text"]) \
+                    and start <= merged[-1]["end"] + CHUNK_OVERLAP:
+                merged[-1]["end"] = max(merged[-1]["end"], end)
+                continue
+            merged.append({"start": start, "end": end, "text": segment["text"]})
+    return merged
+
+
+async def transcribe_in_chunks(audio_path, transcribe, work_dir, language="fr",
+                               chunk_seconds=CHUNK_SECONDS, overlap=CHUNK_OVERLAP, fanout=CHUNK_FANOUT):
+    """Transcribe a long recording as overlapping chunks in parallel.
+
+    Args:
+        audio_path: Path to the audio file
+        transcribe: coroutine function ``(chunk_path, language) -> segments``
+        work_dir: Directory in which each call keeps its decoded audio and chunk files
+        language: Language code for transcription ("en" or "fr")
+
+    Returns:
+        Merged segments with absolute timestamps, or None when the file is short
+        enough (or cannot be decoded) and should be sent in a single request.
+    """
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    pcm = is_pcm_wav(audio_path)
+    if not pcm and os.path.getsize(audio_path) < CHUNK_MIN_BYTES:
+        return None
+    # Work files go to a directory of their own, so concurrent calls on one session never share them
+    call_dir = tempfile.mkdtemp(dir=work_dir)
+    try:
+        wav_path = audio_path
+        if not pcm:
+            wav_path = await decode_to_wav(audio_path, os.path.join(call_dir, f"{base}_decoded.wav"))
+            if not wav_path:
+                logger.warning(f"Cannot decode {audio_path} for chunking, sending it in one request")
+                return None
+        duration = wav_duration(wav_path)
+        if duration <= chunk_seconds + overlap:
+            if wav_path != audio_path:
+                # Decoded only for its size; the WAV is short enough for one request
+                return await transcribe(wav_path, language)
+            return None
+        energies = await asyncio.to_thread(frame_energies, wav_path)
+        spans = plan_chunks(energies, duration, chunk_seconds=chunk_seconds)
+        logger.debug(f"Transcribing {audio_path} ({duration:.0f}s) as {len(spans)} chunks")
+
+        semaphore = asyncio.Semaphore(fanout)
+
+        async def transcribe_chunk(index, core_start, core_end):
+            read_start = max(0.0, core_start - overlap)
+            read_end = min(duration, core_end + overlap)
+            chunk_path = os.path.join(call_dir, f"{base}_chunk_{index}.wav")
+            async with semaphore:
+                await asyncio.to_thread(write_wav_slice, wav_path, chunk_path, read_start, read_end)
+                segments = await transcribe(chunk_path, language)
+            return core_start, core_end, read_start, segments
+
+        chunk_results = await asyncio.gather(*[
+            transcribe_chunk(index, core_start, core_end)
+            for index, (core_start, core_end) in enumerate(spans)
+        ])
+        return merge_chunk_segments(list(chunk_results))
+    finally:
+        shutil.rmtree(call_dir, ignore_errors=True)
@@ -0,0 +1,235 @@
+# history_store.py
+import os
+import sqlite3
+import threading
+import time
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH", os.path.join("data", "history.db"))
+PREVIEW_LENGTH = 500
+
+METADATA_COLUMNS = "id, filename, audio_path, language, timestamp, refined, transcription_length, preview"
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HistoryStore:
+    """SQLite-backed history of transcriptions.
+
+    Listing returns metadata plus a short preview only; full transcripts are
+    fetched one at a time by id or audio path. Transcript segments and summaries
+    are also kept in FTS5 indexes, maintained by triggers, for full-text search.
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL,
+                    audio_path TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    refined INTEGER NOT NULL DEFAULT 1,
+                    transcription_length INTEGER NOT NULL,
+                    preview TEXT NOT NULL,
+                    transcription TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_transcriptions_audio_path ON transcriptions (audio_path);
+                CREATE INDEX IF NOT EXISTS idx_transcriptions_timestamp ON transcriptions (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_transcriptions_language ON transcriptions (language, timestamp);
+
+                CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    transcription_id INTEGER NOT NULL,
+                    start_time REAL NOT NULL,
+                    end_time REAL NOT NULL,
+                    text TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_segments_transcription ON segments (transcription_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+                    text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+                    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+                    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                END;
+
+                CREATE TABLE IF NOT EXISTS summaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    transcription_id INTEGER,
+                    language TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    summary TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_summaries_transcription ON summaries (transcription_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS summaries_fts USING fts5(
+                    summary, content='summaries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS summaries_ai AFTER INSERT ON summaries BEGIN
+                    INSERT INTO summaries_fts (rowid, summary) VALUES (new.id, new.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS summaries_ad AFTER DELETE ON summaries BEGIN
+                    INSERT INTO summaries_fts (summaries_fts, rowid, summary) VALUES ('delete', old.id, old.summary);
+                END;
+            """)
+
+    @staticmethod
+    def _to_dict(row):
+        item = dict(row)
+        if "refined" in item:
+            item["refined"] = bool(item["refined"])
+        return item
+
+    def _insert_segments(self, item_id, segments):
+        self.conn.executemany(
+            "INSERT INTO segments (transcription_id, start_time, end_time, text) VALUES (?, ?, ?, ?)",
+            [(item_id, segment["start"], segment["end"], segment["text"].strip()) for segment in segments]
+        )
+
+    def add(self, audio_path, transcription, language, refined=True, segments=()):
+        """Insert a transcription (and its segments into the search index) and return its id."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO transcriptions (filename, audio_path, language, timestamp, refined,"
+                " transcription_length, preview, transcription) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.basename(audio_path), audio_path, language, time.strftime("%Y-%m-%d %H:%M:%S"),
+                 int(refined), len(transcription), transcription[:PREVIEW_LENGTH], transcription)
+            )
+            self._insert_segments(cursor.lastrowid, segments)
+            return cursor.lastrowid
+
+    def update_transcription(self, item_id, transcription, refined=True, segments=()):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE transcriptions SET transcription = ?, preview = ?, transcription_length = ?, refined = ?"
+                " WHERE id = ?",
+                (transcription, transcription[:PREVIEW_LENGTH], len(transcription), int(refined), item_id)
+            )
+            self.conn.execute("DELETE FROM segments WHERE transcription_id = ?", (item_id,))
+            self._insert_segments(item_id, segments)
+
+    def add_summary(self, summary, language, transcription_id=None):
+        """Store a summary in the search index and return its id."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO summaries (transcription_id, language, timestamp, summary) VALUES (?, ?, ?, ?)",
+                (transcription_id, language, time.strftime("%Y-%m-%d %H:%M:%S"), summary)
+            )
+            return cursor.lastrowid
+
+    def find_id_by_transcription(self, transcription):
+        """Return the id of the most recent item with exactly this transcript, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id FROM transcriptions WHERE transcription_length = ? AND transcription = ?"
+                " ORDER BY id DESC LIMIT 1",
+                (len(transcription), transcription)
+            ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _match_expression(query):
+        """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+        tokens = SEARCH_TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return None
+        quoted = [f'"{token}"' for token in tokens]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search(self, query, limit=20, language=None, kind="all"):
+        """Ranked full-text search over transcript segments and summaries.
+
+        Returns a list of hits with the session, segment timestamps (for segment
+        hits) and a highlighted snippet. BM25 scores depend on each index's own
+        corpus statistics and cannot be compared across indexes, so segment and
+        summary hits are interleaved by their rank within their own index.
+        """
+        match = self._match_expression(query)
+        if not match:
+            return []
+        segment_hits = []
+        summary_hits = []
+        language_filter = "AND t.language = ?" if language else ""
+        params = [match] + ([language] if language else []) + [limit]
+        with self.lock:
+            if kind in ("all", "segments"):
+                rows = self.conn.execute(f"""
+                    SELECT s.transcription_id, t.filename, t.audio_path, t.timestamp, s.start_time, s.end_time,
+                           snippet(segments_fts, 0, '<b>', '</b>', '…', 16) AS snippet,
+                           bm25(segments_fts) AS score
+                    FROM segments_fts
+                    JOIN segments s ON s.id = segments_fts.rowid
+                    JOIN transcriptions t ON t.id = s.transcription_id
+                    WHERE segments_fts MATCH ? {language_filter}
+                    ORDER BY score LIMIT ?
+                """, params).fetchall()
+                segment_hits = [{"type": "segment", "rank": rank, **dict(row)} for rank, row in enumerate(rows, 1)]
+            if kind in ("all", "summaries"):
+                summary_language_filter = "AND m.language = ?" if language else ""
+                rows = self.conn.execute(f"""
+                    SELECT m.id AS summary_id, m.transcription_id, t.filename, t.audio_path, m.timestamp,
+                           snippet(summaries_fts, 0, '<b>', '</b>', '…', 16) AS snippet,
+                           bm25(summaries_fts) AS score
+                    FROM summaries_fts
+                    JOIN summaries m ON m.id = summaries_fts.rowid
+                    LEFT JOIN transcriptions t ON t.id = m.transcription_id
+                    WHERE summaries_fts MATCH ? {summary_language_filter}
+                    ORDER BY score LIMIT ?
+                """, params).fetchall()
+                summary_hits = [{"type": "summary", "rank": rank, **dict(row)} for rank, row in enumerate(rows, 1)]
+        # Stable sort on rank alone: segment then summary hit of rank 1, then of rank 2, ...
+        hits = sorted(segment_hits + summary_hits, key=lambda hit: hit["rank"])
+        return hits[:limit]
+
+    def list(self, limit=50, offset=0, language=None, since=None, until=None):
+        """Return ({metadata items, newest first}, total matching count)."""
+        conditions = []
+        params = []
+        if language:
+            conditions.append("language = ?")
+            params.append(language)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            total = self.conn.execute(f"SELECT COUNT(*) FROM transcriptions {where}", params).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT {METADATA_COLUMNS} FROM transcriptions {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [self._to_dict(row) for row in rows], total
+
+    def get(self, item_id):
+        """Return the full item, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM transcriptions WHERE id = ?", (item_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_by_audio_path(self, audio_path):
+        """Return the most recent full item for an audio path, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM transcriptions WHERE audio_path = ? ORDER BY id DESC LIMIT 1", (audio_path,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def close(self):
+        self.conn.close()
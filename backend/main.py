@@ -1,17 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Body
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Body, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from chat import handle_chat_query
-from transcription import TranscriptionService
-from summarization import summarize_audit_transcription
+from chat import handle_chat_query, stream_chat_query, answer_question, stream_answer
+from chat_sessions import ChatSessionStore
+from sessions import SessionManager, DEFAULT_SESSION_ID
+from capture import recover_partial_recordings
+from upload_stream import MultipartUpload
+from summarization import summarize_audit_transcription, stream_audit_summary, get_cached_summary, cache_summary, \
+    SUMMARY_OUTPUT_MODE
+from upstream import upstream
+from cache import transcription_cache, summary_cache
+from answer_cache import answer_cache
+import audio_codec
 from report_generator import AuditReportGenerator
 from report_generator_en import AuditReportGenerator as AuditReportGeneratorEN
 import os
 import time
+import json
 
 app = FastAPI()
-transcription_service = TranscriptionService()
+session_manager = SessionManager()
+history_store = session_manager.history
+chat_sessions = ChatSessionStore()
 report_generator = AuditReportGenerator()
 
 # Serve static files from the "recordings" directory
@@ -26,61 +37,209 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup():
+    # Patch the headers of recordings interrupted by a crash so they can be played and transcribed
+    recover_partial_recordings("recordings")
+    session_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await session_manager.shutdown()
+    await upstream.close()
+
+# Every recording endpoint takes an optional session_id; without one the shared default session is used
+@app.post("/sessions")
+async def create_session(language: str = "fr"):
+    session = await session_manager.create(language=language)
+    return session.get_info()
+
+@app.get("/sessions")
+async def list_sessions():
+    return {"sessions": session_manager.list()}
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = await session_manager.get(session_id)
+    return session.get_info()
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    await session_manager.close(session_id)
+    return {"message": f"Session {session_id} closed"}
+
 @app.post("/start_recording")
-async def start_recording(language: str = "fr"):
-    # Set the transcription language
-    transcription_service.transcription_language = language
-    return await transcription_service.start_recording()
+async def start_recording(language: str = None, session_id: str = None, device: str = None,
+                          live_summary: bool = None):
+    session = await session_manager.get(session_id)
+    # Set the transcription language (sessions keep the language they were created with otherwise)
+    if language:
+        session.transcription_language = language
+    if device is not None and device.isdigit():
+        device = int(device)
+    return {**(await session.start_recording(device=device, live_summary=live_summary)),
+            "session_id": session.session_id}
 
 @app.post("/stop_recording")
-async def stop_recording():
-    return await transcription_service.stop_recording()
+async def stop_recording(mode: str = None, refine: bool = None, session_id: str = None):
+    if mode is not None and mode not in ["stitched", "full"]:
+        raise HTTPException(status_code=400, detail="Mode must be 'stitched' or 'full'")
+    session = await session_manager.get(session_id)
+    return await session.stop_recording(mode=mode, refine=refine)
 
 @app.post("/upload_audio")
-async def upload_audio(file: UploadFile = File(...), language: str = "fr"):
-    # Set the transcription language
-    transcription_service.transcription_language = language
-    # Use TranscriptionService to save and transcribe the uploaded file
-    audio_path = await transcription_service.save_uploaded_file(file)
-    transcription_data = await transcription_service.transcribe_audio_file(audio_path)
+async def upload_audio(request: Request, language: str = None, session_id: str = None):
+    session = await session_manager.get(session_id)
+    # The multipart body is parsed as it arrives (not spooled by FastAPI first), so the size
+    # limit and the upload progress metrics apply while the client is still sending
+    upload = await session.save_uploaded_file(MultipartUpload(request))
+    audio_path = upload["audio_path"]
+    transcription_data = await session.transcribe_audio_file(audio_path, audio_hash=upload["sha256"], language=language)
     return {
+        "id": transcription_data["id"],
         "audio_path": audio_path,
         "transcription": transcription_data["transcription"],
-        "filename": file.filename,
-        "language": language
+        "filename": upload["filename"],
+        "language": language or session.transcription_language,
+        "size": upload["size"],
+        "sha256": upload["sha256"]
     }
 
 @app.get("/transcription/{audio_path:path}")
 async def get_transcription_by_path(audio_path: str):
-    for item in transcription_service.history:
-        if item["audio_path"] == audio_path:
-            return {"transcription": item["transcription"]}
-    raise HTTPException(status_code=404, detail="Transcription not found")
+    item = history_store.get_by_audio_path(audio_path)
+    if not item:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return {"id": item["id"], "transcription": item["transcription"]}
 
 @app.get("/history")
-async def get_history():
-    history = await transcription_service.get_history()
-    print("History data:", history)
-    return history
+async def get_history(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0),
+                      language: str = None, since: str = None, until: str = None):
+    items, total = history_store.list(limit=limit, offset=offset, language=language, since=since, until=until)
+    return {"history": items, "total": total, "limit": limit, "offset": offset}
+
+@app.get("/history/{history_id}")
+async def get_history_item(history_id: int):
+    item = history_store.get(history_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return item
+
+@app.get("/search")
+async def search(q: str, limit: int = Query(20, ge=1, le=100), language: str = None, kind: str = "all"):
+    if kind not in ["all", "segments", "summaries"]:
+        raise HTTPException(status_code=400, detail="Kind must be 'all', 'segments' or 'summaries'")
+    started = time.perf_counter()
+    results = history_store.search(q, limit=limit, language=language, kind=kind)
+    return {"query": q, "results": results, "elapsed_ms": (time.perf_counter() - started) * 1000}
 
 @app.get("/real_time_transcription")
-async def get_real_time_transcription():
-    return await transcription_service.get_real_time_transcription()
+async def get_real_time_transcription(since: int = 0, session_id: str = None):
+    session = await session_manager.get(session_id)
+    return await session.get_real_time_transcription(since=since)
+
+@app.get("/real_time_transcription/stream")
+async def stream_real_time_transcription(request: Request, cursor: int = 0, session_id: str = None):
+    session = await session_manager.get(session_id)
+    # EventSource sends Last-Event-ID when it reconnects; it takes precedence over ?cursor=
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    return StreamingResponse(
+        session.stream_real_time_transcription(cursor=cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    metrics = await session_manager.get_metrics()
+    metrics["upstream"] = upstream.get_metrics()
+    metrics["cache"] = await get_cache_stats()
+    metrics["audio"] = audio_codec.get_metrics()
+    metrics["streams"] = upstream.get_stream_metrics()
+    metrics["chat_sessions"] = chat_sessions.get_metrics()
+    return metrics
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "transcriptions": transcription_cache.get_stats(),
+        "summaries": summary_cache.get_stats(),
+        "answers": answer_cache.get_stats(),
+    }
+
+@app.delete("/cache/summaries")
+async def clear_summary_cache():
+    return {"removed": summary_cache.clear()}
+
+@app.delete("/cache/answers")
+async def clear_answer_cache():
+    return {"removed": answer_cache.clear()}
 
 @app.post("/set_transcription_language")
-async def set_transcription_language(data: dict):
+async def set_transcription_language(data: dict, session_id: str = None):
     language = data.get("language", "fr")
     if language not in ["en", "fr"]:
         raise HTTPException(status_code=400, detail="Language must be 'en' or 'fr'")
-    transcription_service.transcription_language = language
+    session = await session_manager.get(session_id or data.get("session_id"))
+    session.transcription_language = language
     return {"message": f"Transcription language set to {language}"}
 
 @app.post("/summarize")
-async def summarize(language: str = "fr", data: dict = Body(...)):
+async def summarize(language: str = "fr", session_id: str = None, data: dict = Body(...)):
     transcription = data.get("transcription", "")
     if not transcription:
         raise HTTPException(status_code=400, detail="Transcription is required")
-    return await summarize_audit_transcription(transcription, language=language)
+    cached = get_cached_summary(transcription, language)
+    if cached is not None:
+        return {**cached, "cached": True}
+    # A recording summarized live only needs its last segments folded in
+    session = session_manager.sessions.get(session_id or data.get("session_id") or DEFAULT_SESSION_ID)
+    result = await session.get_live_summary(transcription, language) if session else None
+    if result is None:
+        result = await summarize_audit_transcription(transcription, language=language, use_cache=False)
+    store_summary(transcription, language, result, data.get("history_id"))
+    return result
+
+def store_summary(transcription, language, result, history_id=None, mode=SUMMARY_OUTPUT_MODE):
+    cache_summary(transcription, language, result, mode)
+    # Index the summary for full-text search, linked to its session when known
+    history_id = history_id or history_store.find_id_by_transcription(transcription)
+    history_store.add_summary(result["summary"], language, transcription_id=history_id)
+
+@app.post("/summarize/stream")
+async def summarize_stream(language: str = "fr", session_id: str = None, data: dict = Body(...)):
+    """Same as /summarize, streamed as Server-Sent Events ("token" events, then "done" with the result)."""
+    transcription = data.get("transcription", "")
+    if not transcription:
+        raise HTTPException(status_code=400, detail="Transcription is required")
+    # A summary from the configured mode is preferred; one streamed earlier (text mode) also serves
+    cached = get_cached_summary(transcription, language) or get_cached_summary(transcription, language, "text")
+    if cached is not None:
+        result = {**cached, "cached": True}
+    else:
+        session = session_manager.sessions.get(session_id or data.get("session_id") or DEFAULT_SESSION_ID)
+        result = await session.get_live_summary(transcription, language) if session else None
+        if result is not None:
+            store_summary(transcription, language, result, data.get("history_id"))
+
+    async def events():
+        if result is not None:
+            yield f"event: done\ndata: {json.dumps(result)}\n\n"
+            return
+        async for event in stream_audit_summary(
+            transcription, language,
+            on_result=lambda generated, mode: store_summary(transcription, language, generated,
+                                                            data.get("history_id"), mode),
+        ):
+            yield event
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/generate_report")
 async def generate_report(data: dict = Body(...)):
@@ -102,6 +261,72 @@ async def chat_endpoint(data: dict):
     chat_history = data.get("chat_history", [])
     return await handle_chat_query(question, context, chat_history)
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(data: dict):
+    """Same as /chat, streamed as Server-Sent Events ("token" events, then "done" with the full answer)."""
+    question = data.get("question", "")
+    context = data.get("context", {})
+    chat_history = data.get("chat_history", [])
+    return StreamingResponse(
+        stream_chat_query(question, context, chat_history),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Chat sessions hold the audit context and history server-side, so each turn only sends the question
+@app.post("/chat/sessions")
+async def create_chat_session(data: dict = Body(default={})):
+    session = chat_sessions.create(data.get("context", {}), data.get("chat_history", []))
+    return session.get_info()
+
+@app.get("/chat/sessions/{chat_session_id}")
+async def get_chat_session(chat_session_id: str):
+    return chat_sessions.get(chat_session_id).get_info()
+
+@app.put("/chat/sessions/{chat_session_id}/context")
+async def update_chat_session_context(chat_session_id: str, data: dict = Body(...)):
+    session = chat_sessions.get(chat_session_id)
+    async with session.lock:
+        session.set_context(data.get("context", {}))
+    return session.get_info()
+
+@app.delete("/chat/sessions/{chat_session_id}")
+async def delete_chat_session(chat_session_id: str):
+    chat_sessions.close(chat_session_id)
+    return {"message": f"Chat session {chat_session_id} closed"}
+
+@app.post("/chat/sessions/{chat_session_id}/messages")
+async def chat_session_message(chat_session_id: str, data: dict = Body(...)):
+    session = chat_sessions.get(chat_session_id)
+    question = data.get("question", "")
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+    async with session.lock:
+        result = await answer_question(question, lambda: session.messages(question), session.context_hash,
+                                       has_history=session.has_history)
+        session.add_turn(question, result["response"])
+    return {**result, "chat_session_id": chat_session_id}
+
+@app.post("/chat/sessions/{chat_session_id}/messages/stream")
+async def chat_session_message_stream(chat_session_id: str, data: dict = Body(...)):
+    session = chat_sessions.get(chat_session_id)
+    question = data.get("question", "")
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+
+    async def events():
+        async with session.lock:
+            async for event in stream_answer(question, lambda: session.messages(question), session.context_hash,
+                                             has_history=session.has_history,
+                                             on_answer=lambda answer: session.add_turn(question, answer)):
+                yield event
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Ensure the recordings directory exists
 if not os.path.exists("recordings"):
     os.makedirs("recordings")
\ No newline at end of file
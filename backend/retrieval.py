@@ -0,0 +1,102 @@
+# retrieval.py
+import os
+import re
+import math
+import hashlib
+import unicodedata
+from collections import Counter, OrderedDict
+from summarization import chunk_transcript
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Passage size, number of passages sent per chat turn and BM25 parameters
+RETRIEVAL_PASSAGE_CHARS = int(os.environ.get("RETRIEVAL_PASSAGE_CHARS", "800"))
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "6"))
+RETRIEVAL_INDEX_CACHE = int(os.environ.get("RETRIEVAL_INDEX_CACHE", "32"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+WORD = re.compile(r"\w+")
+# Function words carry no signal for audit questions; everything else is kept
+STOPWORDS = frozenset("""
+le la les un une des du de d l au aux et ou en dans sur pour par avec sans ce cet cette ces qui que quoi
+quel quelle quels quelles est sont a ont il elle ils elles on nous vous je tu se s ne pas plus y c qu n
+the a an and or of to in on for by with without is are was were be been it this that these those what
+which who how do does did i you we they he she
+""".split())
+
+
+def tokenize(text, stopwords=STOPWORDS):
+    """Lowercased, accent-free word tokens without ``stopwords``."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [word for word in WORD.findall(text) if word not in stopwords]
+
+
+class TranscriptIndex:
+    """BM25 index over the passages of one transcript."""
+
+    def __init__(self, transcription, passage_chars=RETRIEVAL_PASSAGE_CHARS):
+        self.passages = chunk_transcript(transcription, max_chars=passage_chars)
+        self.term_counts = [Counter(tokenize(passage)) for passage in self.passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        count = len(self.passages)
+        self.idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def search(self, query, top_k=RETRIEVAL_TOP_K):
+        """Indexes of the ``top_k`` passages most relevant to ``query``, best first."""
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        scores = []
+        for index, counts in enumerate(self.term_counts):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / (self.average_length or 1))
+            for term in terms:
+                frequency = counts.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (BM25_K1 + 1) / (frequency + norm)
+            if score > 0:
+                scores.append((score, index))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return [index for _, index in scores[:top_k]]
+
+    def context(self, query, top_k=RETRIEVAL_TOP_K):
+        """The relevant passages as prompt text, in transcript order.
+
+        A transcript short enough to fit in ``top_k`` passages is returned whole;
+        when nothing matches, the opening passages are used.
+        """
+        if len(self.passages) <= top_k:
+            return "".join(self.passages)
+        indexes = self.search(query, top_k) or list(range(top_k))
+        return "\n[...]\n".join(self.passages[index].strip() for index in sorted(indexes))
+
+
+_indexes = OrderedDict()  # transcript hash -> TranscriptIndex, least recently used first
+
+
+def get_index(transcription):
+    """Index of ``transcription``, built on first use and kept for the following chat turns."""
+    key = hashlib.sha256(transcription.encode("utf-8")).hexdigest()
+    index = _indexes.get(key)
+    if index is None:
+        index = TranscriptIndex(transcription)
+        logger.info(f"Indexed transcript into {len(index.passages)} passages")
+        _indexes[key] = index
+        while len(_indexes) > RETRIEVAL_INDEX_CACHE:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(key)
+    return index
+
+
+def retrieve_context(transcription, query, top_k=RETRIEVAL_TOP_K):
+    """The transcript passages relevant to ``query``."""
+    if not transcription:
+        return ""
+    return get_index(transcription).context(query, top_k)
@@ -0,0 +1,113 @@
+# sessions.py
+import os
+import asyncio
+import time
+import uuid
+from fastapi import HTTPException
+from transcription import TranscriptionService
+from history_store import HistoryStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "16"))
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "3600"))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "60"))
+# Requests without a session id share this session, so single-user clients keep working
+DEFAULT_SESSION_ID = "default"
+
+
+class SessionManager:
+    """Isolated TranscriptionService sessions keyed by session id.
+
+    Sessions share the history store. Idle sessions (not recording, not refining)
+    are evicted after SESSION_IDLE_TIMEOUT and at most MAX_SESSIONS exist at once.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.history = HistoryStore()
+        self.sessions = {}
+        self.evicted = 0
+        self.sweeper_task = None
+
+    async def create(self, language="fr", session_id=None):
+        """Create a new session, evicting idle ones if the cap is reached."""
+        if len(self.sessions) >= self.max_sessions:
+            await self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPException(status_code=429, detail=f"Too many active sessions (max {self.max_sessions})")
+        session_id = session_id or uuid.uuid4().hex
+        session = TranscriptionService(session_id=session_id, history=self.history, language=language)
+        self.sessions[session_id] = session
+        logger.debug(f"Created session {session_id}")
+        return session
+
+    async def get(self, session_id=None):
+        """Return a session by id; no id means the shared default session."""
+        session = self.sessions.get(session_id or DEFAULT_SESSION_ID)
+        if session is None:
+            if session_id and session_id != DEFAULT_SESSION_ID:
+                raise HTTPException(status_code=404, detail="Session not found")
+            session = await self.create(session_id=DEFAULT_SESSION_ID)
+        session.touch()
+        return session
+
+    async def close(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        await session.close()
+        logger.debug(f"Closed session {session_id}")
+
+    async def evict_idle(self):
+        """Close sessions that have been idle longer than the timeout."""
+        now = time.monotonic()
+        idle = [
+            session_id for session_id, session in self.sessions.items()
+            if not session.busy and now - session.last_active > self.idle_timeout
+        ]
+        for session_id in idle:
+            session = self.sessions.pop(session_id)
+            await session.close()
+            self.evicted += 1
+            logger.debug(f"Evicted idle session {session_id}")
+        return len(idle)
+
+    async def _sweep(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error evicting idle sessions: {str(e)}")
+
+    def start(self, interval=SESSION_SWEEP_INTERVAL):
+        """Start the background eviction of idle sessions."""
+        self.sweeper_task = asyncio.create_task(self._sweep(interval))
+
+    async def shutdown(self):
+        if self.sweeper_task:
+            self.sweeper_task.cancel()
+        for session_id in list(self.sessions):
+            await self.close(session_id)
+        self.history.close()
+
+    def list(self):
+        return [session.get_info() for session in self.sessions.values()]
+
+    async def get_metrics(self):
+        sessions = {}
+        for session_id, session in self.sessions.items():
+            sessions[session_id] = {
+                **(await session.get_capture_metrics()),
+                "uploads": await session.get_upload_metrics(),
+            }
+        return {
+            "active_sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "recording_sessions": sum(1 for session in self.sessions.values() if session.recording),
+            "evicted_sessions": self.evicted,
+            "sessions": sessions,
+        }
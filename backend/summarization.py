@@ -1,9 +1,26 @@
 # summarization.py
+import os
 import re
-from groq import Groq
+import asyncio
+import hashlib
+import json
 from fastapi import HTTPException
-
-client = Groq()
+from pydantic import ValidationError
+from groq import BadRequestError
+from upstream import upstream, PRIORITY_SUMMARY, CHAT_MODEL
+from cache import summary_cache
+from summary_parser import parse_summary
+from summary_schema import AuditSummary
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Transcripts longer than this are summarized chunk by chunk (map) and the findings merged (reduce)
+SUMMARY_CHUNK_CHARS = int(os.environ.get("SUMMARY_CHUNK_CHARS", "12000"))
+SUMMARY_MAP_MAX_TOKENS = int(os.environ.get("SUMMARY_MAP_MAX_TOKENS", "2048"))
+# "json" asks the model for a JSON object validated against AuditSummary and renders the prose locally;
+# "text" asks for the prose template and parses it
+SUMMARY_OUTPUT_MODE = os.environ.get("SUMMARY_OUTPUT_MODE", "json")
 
 french_prompt = """
 Vous allez recevoir une transcription brute d'une réunion d'audit en français, contenant un langage oral informel, des mots de remplissage (euh, donc, etc.), des pauses et des discussions hors sujet. Votre tâche est de résumer les informations clés liées à l'audit dans un format structuré et clair, en éliminant tout contenu inutile. Suivez scrupuleusement la structure et les variables fournies ci-dessous, sans modifier les noms des variables ou les champs. Si une information n'est pas mentionnée dans la transcription, indiquez "Non spécifié".
@@ -109,178 +126,433 @@ Additional instructions:
 - For the management system, identify the type (e.g., "occupational health and safety", "quality", "environment") based on the standard or context.
 """
 
+french_json_prompt = """
+Vous allez recevoir une transcription brute d'une réunion d'audit en français, contenant un langage oral informel, des mots de remplissage (euh, donc, etc.), des pauses et des discussions hors sujet. Votre tâche est d'extraire les informations clés liées à l'audit, en éliminant tout contenu inutile, et de répondre uniquement par un objet JSON avec exactement les clés suivantes :
+
+{
+  "client_name": "nom de l'entreprise auditée",
+  "client_address": "adresse de l'entreprise",
+  "audit_period": "date de début - date de fin",
+  "reference_standard": "norme de référence",
+  "audit_type": "type d'audit",
+  "auditor_name": "nom de l'auditeur principal",
+  "audit_manager": "nom du responsable de l'audit",
+  "audit_team_members": "noms des membres de l'équipe d'audit",
+  "management_system": "type de système de gestion",
+  "non_conformities_count": nombre de non-conformités détectées,
+  "compliance_items": [{"process": "processus", "requirement": "exigence", "comment": "commentaire", "rating": "évaluation"}],
+  "reference_documents": ["document"],
+  "activity_description": "description de l'activité auditée",
+  "processes_list": ["processus audité"],
+  "positive_points": ["point positif"],
+  "recommendations": ["recommandation générale"],
+  "resume": "phrase résumant l'état général du système de management"
+}
+
+Instructions supplémentaires :
+- Rédigez les valeurs en français.
+- Si une information n'est pas mentionnée dans la transcription, indiquez "Non spécifié" (ou une liste vide pour les listes).
+- Assurez-vous que les données extraites de la transcription sont exactes et non interprétées.
+- Pour le type d'audit, déduisez "Audit interne" si l'audit est conduit par une équipe interne, sinon précisez selon le contexte.
+- Pour le système de gestion, identifiez le type (ex. "santé et sécurité au travail", "qualité", "environnement") basé sur la norme ou le contexte.
+"""
+
+english_json_prompt = """
+You will receive a raw transcription of an audit meeting in English, containing informal spoken language, filler words (um, so, etc.), pauses, and off-topic discussions. Your task is to extract the key information related to the audit, eliminating any unnecessary content, and to answer only with a JSON object with exactly the following keys:
+
+{
+  "client_name": "name of the audited company",
+  "client_address": "address of the company",
+  "audit_period": "start date - end date",
+  "reference_standard": "reference standard",
+  "audit_type": "audit type",
+  "auditor_name": "name of the lead auditor",
+  "audit_manager": "name of the audit manager",
+  "audit_team_members": "names of the audit team members",
+  "management_system": "management system type",
+  "non_conformities_count": number of non-conformities detected,
+  "compliance_items": [{"process": "process", "requirement": "requirement", "comment": "comment", "rating": "rating"}],
+  "reference_documents": ["document"],
+  "activity_description": "description of the audited activity",
+  "processes_list": ["audited process"],
+  "positive_points": ["positive point"],
+  "recommendations": ["general recommendation"],
+  "resume": "sentence summarizing the overall state of the management system"
+}
 
-async def summarize_audit_transcription(raw_transcription, language: str = "fr"):
-    """Summarize an audit transcription into a structured format based on language."""
+Additional instructions:
+- Write the values in English.
+- If information is missing in the transcription, indicate "Not specified" (or an empty list for lists).
+- Ensure that the data extracted from the transcription is accurate and not interpreted.
+- For the audit type, infer "Internal Audit" if the audit is conducted by an internal team, otherwise specify according to the context.
+- For the management system, identify the type (e.g., "occupational health and safety", "quality", "environment") based on the standard or context.
+"""
+
+
+system_messages = {
+    "fr": "Vous êtes un assistant spécialisé dans la synthèse de rapports d'audit.",
+    "en": "You are an assistant specialized in summarizing audit reports.",
+}
+
+live_notes = {
+    "fr": "Cette transcription est un extrait d'un audit en cours d'enregistrement. "
+          "Ne résumez que les informations présentes dans cet extrait.",
+    "en": "This transcription is an excerpt of an audit still being recorded. "
+          "Only summarize the information present in this excerpt.",
+}
+
+# Added to the live note so the rolling summary keeps one résumé of the whole recording so far
+live_resume_notes = {
+    "fr": "Résumé de l'audit jusqu'ici : {resume}\n"
+          "Dans la section « Résumé », réécrivez ce résumé en y intégrant les informations de cet extrait.",
+    "en": "Summary of the audit so far: {resume}\n"
+          "In the \"Summary\" section, rewrite this summary to include the information of this excerpt.",
+}
+
+chunk_notes = {
+    "fr": "Cette transcription est la partie {index} sur {count} d'un audit plus long. "
+          "Ne résumez que les informations présentes dans cette partie.",
+    "en": "This transcription is part {index} of {count} of a longer audit. "
+          "Only summarize the information present in this part.",
+}
+
+
+# Bump when the parsing or merging of summaries changes; prompt edits are picked up automatically
+SUMMARY_PROMPT_VERSION = "3"
+def _prompt_fingerprint(mode):
+    return hashlib.sha256(
+        "\x1f".join([SUMMARY_PROMPT_VERSION, mode, french_prompt, english_prompt, french_json_prompt,
+                      english_json_prompt, *system_messages.values(), *live_notes.values(),
+                      *live_resume_notes.values(), *chunk_notes.values()]).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+# Results of the text template and of JSON output are cached apart, whichever mode is configured
+PROMPT_FINGERPRINTS = {mode: _prompt_fingerprint(mode) for mode in {"text", "json", SUMMARY_OUTPUT_MODE}}
+PROMPT_FINGERPRINT = PROMPT_FINGERPRINTS[SUMMARY_OUTPUT_MODE]
+
+
+def _summary_key(transcription, language, mode=SUMMARY_OUTPUT_MODE):
+    transcript_hash = hashlib.sha256(transcription.encode("utf-8")).hexdigest()
+    return transcript_hash, language, PROMPT_FINGERPRINTS[mode], CHAT_MODEL
+
+
+def get_cached_summary(transcription, language="fr", mode=SUMMARY_OUTPUT_MODE):
+    """Return the cached {summary, structured_data} for a transcript, or None.
+
+    ``mode`` is the output mode ("text" or "json") the summary was produced with.
+    """
+    return summary_cache.get(*_summary_key(transcription, language, mode))
+
+
+def cache_summary(transcription, language, result, mode=SUMMARY_OUTPUT_MODE):
+    summary_cache.set({"summary": result["summary"], "structured_data": result["structured_data"]},
+                      *_summary_key(transcription, language, mode))
+
+
+def chunk_transcript(transcription, max_chars=SUMMARY_CHUNK_CHARS):
+    """Split a transcript into chunks of at most ``max_chars``, on line (segment) boundaries.
+
+    A single line longer than ``max_chars`` is split on the last space before the limit.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in transcription.splitlines(keepends=True):
+        while len(line) > max_chars:
+            cut = line.rfind(" ", 0, max_chars) + 1 or max_chars
+            line, head = line[cut:], line[:cut]
+            if current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            chunks.append(head)
+        if current and size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _summary_messages(transcription, language, note=""):
+    prompt = english_prompt if language == "en" else french_prompt
+    full_prompt = prompt + (f"\n{note}\n" if note else "") + "\n\nTranscription:\n" + transcription
+    return [
+        {"role": "system", "content": system_messages["en" if language == "en" else "fr"]},
+        {"role": "user", "content": full_prompt}
+    ]
+
+
+async def _request_summary(transcription, language, max_tokens, note=""):
+    response = await upstream.chat(
+        messages=_summary_messages(transcription, language, note),
+        temperature=0.3,  # Lower temperature for more precise output
+        max_tokens=max_tokens,
+        priority=PRIORITY_SUMMARY,
+    )
+    return response.choices[0].message.content
+
+
+async def _request_structured(transcription, language, max_tokens, note=""):
+    """Ask for the findings as a JSON object and validate it against AuditSummary."""
+    prompt = english_json_prompt if language == "en" else french_json_prompt
+    full_prompt = prompt + (f"\n{note}\n" if note else "") + "\n\nTranscription:\n" + transcription
+    response = await upstream.chat(
+        messages=[
+            {"role": "system", "content": system_messages["en" if language == "en" else "fr"]},
+            {"role": "user", "content": full_prompt}
+        ],
+        temperature=0.3,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},
+        priority=PRIORITY_SUMMARY,
+    )
+    content = response.choices[0].message.content
+    return AuditSummary.model_validate(json.loads(content)).to_structured_data(language)
+
+
+async def _request_findings(transcription, language, max_tokens, note=""):
+    """Structured data for one chunk, from JSON output or, failing that, the parsed prose template."""
+    if SUMMARY_OUTPUT_MODE == "json":
+        try:
+            return await _request_structured(transcription, language, max_tokens, note)
+        except (ValueError, ValidationError, BadRequestError) as e:
+            # Groq rejects JSON-mode answers that are not valid JSON with a 400
+            logger.warning(f"Structured summary was not valid JSON for the schema, using the text template: {e}")
+    summary = await _request_summary(transcription, language, max_tokens, note)
+    return parse_summary(summary, language)
+
+
+def _placeholders(language):
     if language == "en":
-        prompt = english_prompt
+        values = ["Not specified", "No information", "No positive points mentioned",
+                  "No recommendations provided", "No summary provided", "N/A"]
     else:
-        prompt = french_prompt
+        values = ["Non spécifié", "Aucune information", "Aucun point positif mentionné",
+                  "Aucune recommandation fournie", "Aucun résumé fourni", "N/A"]
+    return {_normalize(value) for value in values} | {""}
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text).casefold()).split())
+
+
+def merge_structured_data(parts, language="fr", latest_resume=False):
+    """Merge the structured data of several transcript chunks into one, dropping duplicates.
+
+    Single-valued fields take the first specified value; lists are concatenated in
+    chunk order without placeholders or (normalized) duplicates. The résumés are
+    joined, or with ``latest_resume`` the last specified one replaces the others.
+    """
+    placeholders = _placeholders(language)
+    not_specified = "Not specified" if language == "en" else "Non spécifié"
+
+    def specified(value):
+        return _normalize(value) not in placeholders
+
+    merged = {}
+    for field in ("client_name", "client_address", "reference_standard", "audit_type", "auditor_name",
+                  "audit_manager", "audit_team_members", "management_system", "activity_description"):
+        merged[field] = next((part[field] for part in parts if specified(part.get(field, ""))), not_specified)
+
+    periods = [part["audit_period"].split(" - ", 1) for part in parts if " - " in part.get("audit_period", "")]
+    start_date = next((start for start, _ in periods if specified(start)), not_specified)
+    end_date = next((end for _, end in periods if specified(end)), not_specified)
+    merged["audit_period"] = f"{start_date} - {end_date}"
+
+    for field in ("reference_documents", "processes_list", "positive_points", "recommendations"):
+        seen = set()
+        merged[field] = []
+        for part in parts:
+            for item in part.get(field, []):
+                key = _normalize(item)
+                if key not in placeholders and key not in seen:
+                    seen.add(key)
+                    merged[field].append(item)
+
+    seen = set()
+    compliance_items = []
+    for part in parts:
+        for item in part.get("compliance_items", []):
+            key = (_normalize(item["process"]), _normalize(item["requirement"]), _normalize(item["comment"]))
+            if key[0] in placeholders and key[2] in placeholders or key in seen:
+                continue
+            seen.add(key)
+            compliance_items.append(item)
+    merged["compliance_items"] = compliance_items
+    counts = [int(part["non_conformities_count"]) for part in parts
+              if str(part.get("non_conformities_count", "")).isdigit()]
+    merged["non_conformities_count"] = str(len(compliance_items) if compliance_items else max(counts, default=0))
+
+    resumes = []
+    for part in parts:
+        if specified(part.get("resume", "")) and _normalize(part["resume"]) not in map(_normalize, resumes):
+            resumes.append(part["resume"])
+    merged["resume"] = resumes[-1] if latest_resume and resumes else " ".join(resumes)
+
+    defaults = parse_summary("", language)
+    for field in ("reference_documents", "processes_list", "compliance_items", "positive_points",
+                  "recommendations", "resume"):
+        merged[field] = merged[field] or defaults[field]
+    return merged
+
+
+def render_summary(structured_data, language="fr"):
+    """Write structured data back as a summary in the prompt's structure."""
+    data = structured_data
+    start_date, _, end_date = data["audit_period"].partition(" - ")
+    if language == "en":
+        lines = [
+            f"Audit of {data['client_name']} ({data['client_address']}) conducted from {start_date} to {end_date}"
+            f" according to the {data['reference_standard']}.",
+            "", f"Audit Type: {data['audit_type']}",
+            "", f"Lead Auditor: {data['auditor_name']}",
+            "", f"Audit Manager: {data['audit_manager']}",
+            "", f"Audit Team: {data['audit_team_members']}",
+            "", f"Management System: {data['management_system']}",
+            "", f"Non-conformities detected: {data['non_conformities_count']}",
+            "", "Details of non-conformities:",
+        ]
+        lines += [f"- {item['process']} ({item['requirement']}): {item['comment']} (Rating: {item['rating']})"
+                  for item in data["compliance_items"]]
+        sections = [("Reference Documents:", "reference_documents"), ("Audited Activity:", None),
+                    ("Audited Processes:", "processes_list"), ("Positive Points:", "positive_points"),
+                    ("General Recommendations:", "recommendations")]
+        summary_label = "Summary:"
+    else:
+        lines = [
+            f"Audit de {data['client_name']} ({data['client_address']}) mené du {start_date} au {end_date}"
+            f" selon la norme {data['reference_standard']}.",
+            "", f"Type d'audit: {data['audit_type']}",
+            "", f"Auditeur Principal: {data['auditor_name']}",
+            "", f"Responsable de l'audit: {data['audit_manager']}",
+            "", f"Équipe d'audit: {data['audit_team_members']}",
+            "", f"Système de gestion: {data['management_system']}",
+            "", f"Non-conformités détectées: {data['non_conformities_count']}",
+            "", "Détails des non-conformités :",
+        ]
+        lines += [f"- {item['process']} ({item['requirement']}): {item['comment']} (Évaluation: {item['rating']})"
+                  for item in data["compliance_items"]]
+        sections = [("Documents de référence :", "reference_documents"), ("Activité auditée:", None),
+                    ("Processus audités :", "processes_list"), ("Points positifs :", "positive_points"),
+                    ("Recommandations générales :", "recommendations")]
+        summary_label = "Résumé :"
+    for label, field in sections:
+        lines.append("")
+        if field is None:
+            lines.append(f"{label} {data['activity_description']}")
+        else:
+            lines.append(label)
+            lines += [f"- {item}" for item in data[field]]
+    lines += ["", f"{summary_label} {data['resume']}"]
+    return "\n".join(lines)
 
-    full_prompt = prompt + "\n\nTranscription:\n" + raw_transcription
 
+async def summarize_findings(transcription, language="fr", note=None, chunks=None):
+    """Structured findings of a transcript, summarizing its chunks concurrently and merging them.
+
+    ``note`` is added to the prompt when the text fits in one chunk (each chunk of
+    a longer text is told its position instead).
+    """
+    chunks = chunks or chunk_transcript(transcription)
+    if len(chunks) == 1:
+        notes = [note or ""]
+    else:
+        template = chunk_notes["en" if language == "en" else "fr"]
+        notes = [template.format(index=index + 1, count=len(chunks)) for index in range(len(chunks))]
+    findings = await asyncio.gather(*[
+        _request_findings(chunk, language, SUMMARY_MAP_MAX_TOKENS, chunk_note)
+        for chunk, chunk_note in zip(chunks, notes)
+    ])
+    return merge_structured_data(list(findings), language)
+
+
+async def update_rolling_summary(structured_data, new_transcription, language="fr"):
+    """Fold the findings of newly transcribed text into a rolling structured summary.
+
+    The model is given the current résumé and rewrites it with the new text, so the
+    rolling résumé is replaced on each update instead of growing by one paragraph.
+    """
+    key = "en" if language == "en" else "fr"
+    note = live_notes[key]
+    previous = structured_data.get("resume", "") if structured_data else ""
+    if _normalize(previous) not in _placeholders(language):
+        note += "\n" + live_resume_notes[key].format(resume=previous)
+    findings = await summarize_findings(new_transcription, language, note=note)
+    if not structured_data:
+        return findings
+    return merge_structured_data([structured_data, findings], language, latest_resume=True)
+
+
+async def summarize_audit_transcription(raw_transcription, language: str = "fr", use_cache=True):
+    """Summarize an audit transcription into a structured format based on language.
+
+    In "json" output mode the model returns the structured data directly and the
+    prose summary is rendered from it. Transcripts longer than SUMMARY_CHUNK_CHARS
+    are split on segment boundaries, the chunks are summarized concurrently and
+    their findings merged. Results are cached by (transcript hash, language,
+    prompt fingerprint, model).
+    """
+    if use_cache:
+        cached = get_cached_summary(raw_transcription, language)
+        if cached is not None:
+            return {**cached, "cached": True}
+    try:
+        chunks = chunk_transcript(raw_transcription)
+        if len(chunks) <= 1 and SUMMARY_OUTPUT_MODE != "json":
+            summary = await _request_summary(raw_transcription, language, max_tokens=8000)
+            result = {"summary": summary, "structured_data": parse_summary(summary, language)}
+        elif len(chunks) <= 1:
+            structured_data = await _request_findings(raw_transcription, language, max_tokens=8000)
+            result = {"summary": render_summary(structured_data, language), "structured_data": structured_data}
+        else:
+            structured_data = await summarize_findings(raw_transcription, language, chunks=chunks)
+            result = {"summary": render_summary(structured_data, language), "structured_data": structured_data,
+                      "chunks": len(chunks)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Summarization error: {str(e)}")
+    if use_cache:
+        cache_summary(raw_transcription, language, result)
+    return result
+
+
+async def stream_audit_summary(raw_transcription, language="fr", on_result=None):
+    """Summarize as Server-Sent Events: "token" events while the summary is written, then "done".
+
+    A transcript that fits in one chunk is streamed from the prose template (the
+    structured data is parsed from it once complete); longer transcripts are
+    summarized map-reduce as usual and only send "done". ``on_result`` is called
+    with the result and the output mode it was produced with ("text" for streamed
+    text, to cache it apart from JSON-mode results) before "done" is sent; failures
+    are reported as an "error" event.
+    """
     try:
-        system_message_content = "Vous êtes un assistant spécialisé dans la synthèse de rapports d'audit." # Default French
-        if language == "en":
-            system_message_content = "You are an assistant specialized in summarizing audit reports." # English System Message
-
-
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_message_content},
-                {"role": "user", "content": full_prompt}
-            ],
-            model="llama3-70b-8192",
-            temperature=0.3,  # Lower temperature for more precise output
-            max_tokens=8000,
-        )
-        summary = response.choices[0].message.content
-
-        # Parse the summary into structured data (Parsing logic now language-aware)
-        structured_data = {}
-        if language == "en":
-            client_match = re.search(r"Audit of (.+?) \((.+?)\)", summary)
-            period_match = re.search(r"conducted from (.+?) to (.+?) according", summary)
-            standard_match = re.search(r"according to the (.+?)\.", summary)
-            type_match = re.search(r"Audit Type: (.+)", summary)
-            auditor_match = re.search(r"Lead Auditor: (.+)", summary)
-            manager_match = re.search(r"Audit Manager: (.+)", summary)
-            team_match = re.search(r"Audit Team: (.+)", summary)
-            system_match = re.search(r"Management System: (.+)", summary)
-            nonconf_match = re.search(r"Non-conformities detected: (\d+)", summary)
+        chunks = chunk_transcript(raw_transcription)
+        if len(chunks) <= 1:
+            parts = []
+            async for delta in upstream.chat_stream(
+                messages=_summary_messages(raw_transcription, language),
+                temperature=0.3,
+                max_tokens=8000,
+                priority=PRIORITY_SUMMARY,
+                tag="summary",
+            ):
+                parts.append(delta)
+                yield f"event: token\ndata: {json.dumps({'text': delta})}\n\n"
+            summary = "".join(parts)
+            result = {"summary": summary, "structured_data": parse_summary(summary, language)}
+            mode = "text"
         else:
-            client_match = re.search(r"Audit de (.+?) \((.+?)\)", summary)
-            period_match = re.search(r"mené du (.+?) au (.+?) selon", summary)
-            standard_match = re.search(r"selon la norme (.+?)\.", summary)
-            type_match = re.search(r"Type d'audit: (.+)", summary)
-            auditor_match = re.search(r"Auditeur Principal: (.+)", summary)
-            manager_match = re.search(r"Responsable de l'audit: (.+)", summary)
-            team_match = re.search(r"Équipe d'audit: (.+)", summary)
-            system_match = re.search(r"Système de gestion: (.+)", summary)
-            nonconf_match = re.search(r"Non-conformités détectées: (\d+)", summary)
-
-        structured_data["client_name"] = client_match.group(1) if client_match else "Non spécifié" if language == "fr" else "Not specified"
-        structured_data["client_address"] = client_match.group(2) if client_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        start_date = period_match.group(1) if period_match else "Non spécifié" if language == "fr" else "Not specified"
-        end_date = period_match.group(2) if period_match else "Non spécifié" if language == "fr" else "Not specified"
-        structured_data["audit_period"] = f"{start_date} - {end_date}"
-
-        standard_match = re.search(r"norme (.+?)\.", summary) if language == "en" else re.search(r"norme (.+?)\.", summary) # both prompts use "norme" before the standard.
-        structured_data["reference_standard"] = standard_match.group(1) if standard_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        audit_type_regex = r"Audit Type: (.+)" if language == "en" else r"Type d'audit: (.+)"
-        type_match = re.search(audit_type_regex, summary)
-        structured_data["audit_type"] = type_match.group(1) if type_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        auditor_name_regex = r"Lead Auditor: (.+)" if language == "en" else r"Auditeur Principal: (.+)"
-        auditor_match = re.search(auditor_name_regex, summary)
-        structured_data["auditor_name"] = auditor_match.group(1) if auditor_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        audit_manager_regex = r"Audit Manager: (.+)" if language == "en" else r"Responsable de l'audit: (.+)"
-        manager_match = re.search(audit_manager_regex, summary)
-        structured_data["audit_manager"] = manager_match.group(1) if manager_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        audit_team_regex = r"Audit Team: (.+)" if language == "en" else r"Équipe d'audit: (.+)"
-        team_match = re.search(audit_team_regex, summary)
-        structured_data["audit_team_members"] = team_match.group(1) if team_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        management_system_regex = r"Management System: (.+)" if language == "en" else r"Système de gestion: (.+)"
-        system_match = re.search(management_system_regex, summary)
-        structured_data["management_system"] = system_match.group(1) if system_match else "Non spécifié" if language == "fr" else "Not specified"
-
-        non_conformities_regex = r"Non-conformities detected: (\d+)" if language == "en" else r"Non-conformités détectées: (\d+)"
-        nonconf_match = re.search(non_conformities_regex, summary)
-        structured_data["non_conformities_count"] = nonconf_match.group(1) if nonconf_match else "0"
-
-        lines = summary.split("\n")
-        compliance_items = []
-        reference_documents = []
-        processes_list = []
-        positive_points = []
-        recommendations = []
-        resume = ""
-        activity_description = ""
-        current_section = None
-
-        for line in lines:
-            line = line.strip()
-            if language == "en":
-                if line.startswith("Details of non-conformities:"):
-                    current_section = "compliance"
-                elif line.startswith("Reference Documents:"):
-                    current_section = "documents"
-                elif line.startswith("Audited Activity:"):
-                    activity_description = line.split(":", 1)[1].strip()
-                elif line.startswith("Audited Processes:"):
-                    current_section = "processes"
-                elif line.startswith("Positive Points:"):
-                    current_section = "positive"
-                elif line.startswith("General Recommendations:"):
-                    current_section = "recommendations"
-                elif line.startswith("Summary:"):
-                    resume = line.split(":", 1)[1].strip()
-            else:
-                if line.startswith("Détails des non-conformités :"):
-                    current_section = "compliance"
-                elif line.startswith("Documents de référence :"):
-                    current_section = "documents"
-                elif line.startswith("Activité auditée:"):
-                    activity_description = line.split(":", 1)[1].strip()
-                elif line.startswith("Processus audités :"):
-                    current_section = "processes"
-                elif line.startswith("Points positifs :"):
-                    current_section = "positive"
-                elif line.startswith("Recommandations générales :"):
-                    current_section = "recommendations"
-                elif line.startswith("Résumé :"):
-                    resume = line.split(":", 1)[1].strip()
-            if line and current_section == "compliance" and line.startswith("-"):
-                parts = line[2:].split(":", 1)
-                process_req = parts[0].strip()
-                comment_rating = parts[1].strip()
-                process_match = re.match(r"(.+?) \((.+?)\)", process_req)
-                process = process_match.group(1) if process_match else process_req
-                requirement_text = "Not specified" if language == "en" else "Non spécifié"
-                requirement = process_match.group(2) if process_match else requirement_text
-
-                if language == "en":
-                    comment_match = re.match(r"(.+?) \(Rating: (.+?)\)", comment_rating)
-                    rating_text = "Not specified"
-                    no_info_text = "No information"
-                else:
-                    comment_match = re.match(r"(.+?) \(Évaluation: (.+?)\)", comment_rating)
-                    rating_text = "Non spécifié"
-                    no_info_text = "Aucune information"
-
-                comment = comment_match.group(1) if comment_match else comment_rating
-                rating = comment_match.group(2) if comment_match else rating_text
-                compliance_items.append({"process": process, "requirement": requirement, "comment": comment, "rating": rating})
-            elif line and current_section in ["documents", "processes", "positive", "recommendations"] and line.startswith("- "):
-                item = line[2:].strip()
-                if current_section == "documents":
-                    reference_documents.append(item)
-                elif current_section == "processes":
-                    processes_list.append(item)
-                elif current_section == "positive":
-                    positive_points.append(item)
-                elif current_section == "recommendations":
-                    recommendations.append(item)
-
-        not_specified = "Not specified" if language == "en" else "Non spécifié"
-        no_info = "No information" if language == "en" else "Aucune information"
-        no_positive = "No positive points mentioned" if language == "en" else "Aucun point positif mentionné"
-        no_recommendations = "No recommendations provided" if language == "en" else "Aucune recommandation fournie"
-        no_summary = "No summary provided" if language == "en" else "Aucun résumé fourni"
-
-        structured_data["reference_documents"] = reference_documents or [not_specified]
-        structured_data["activity_description"] = activity_description or not_specified
-        structured_data["processes_list"] = processes_list or [not_specified]
-        structured_data["compliance_items"] = compliance_items or [{"process": not_specified, "requirement": "N/A", "comment": no_info, "rating": "N/A"}]
-        structured_data["positive_points"] = positive_points or [no_positive]
-        structured_data["recommendations"] = recommendations or [no_recommendations]
-        structured_data["resume"] = resume or no_summary
-
-        return {"summary": summary, "structured_data": structured_data}
+            structured_data = await summarize_findings(raw_transcription, language, chunks=chunks)
+            result = {"summary": render_summary(structured_data, language), "structured_data": structured_data,
+                      "chunks": len(chunks)}
+            mode = SUMMARY_OUTPUT_MODE
+        if on_result:
+            on_result(result, mode)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Summarization error: {str(e)}")
\ No newline at end of file
+        logger.error(f"Summary stream error: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': f'Summarization error: {str(e)}'})}\n\n"
+        return
+    yield f"event: done\ndata: {json.dumps(result)}\n\n"
@@ -0,0 +1,168 @@
+# summary_parser.py
+import re
+
+# Everything that differs between languages is data; the parsing loop is shared.
+# Header fields are (field names, pattern): the first match in the summary sets them.
+LANGUAGE_TABLES = {
+    "fr": {
+        "fields": [
+            (("client_name", "client_address"), r"Audit de (.+?) \((.+?)\)"),
+            (("start_date", "end_date"), r"mené du (.+?) au (.+?) selon"),
+            (("reference_standard",), r"norme (.+?)\."),
+            (("audit_type",), r"Type d['’]audit: (.+)"),
+            (("auditor_name",), r"Auditeur Principal: (.+)"),
+            (("audit_manager",), r"Responsable de l['’]audit: (.+)"),
+            (("audit_team_members",), r"Équipe d['’]audit: (.+)"),
+            (("management_system",), r"Système de gestion: (.+)"),
+            (("non_conformities_count",), r"Non-conformités détectées: (\d+)"),
+        ],
+        # The prompt writes "Équipe d’audit" with a curly apostrophe, so both forms are accepted above
+        # Line prefix -> list section, or inline field (value after the first colon)
+        "sections": {
+            "Détails des non-conformités :": "compliance",
+            "Documents de référence :": "reference_documents",
+            "Processus audités :": "processes_list",
+            "Points positifs :": "positive_points",
+            "Recommandations générales :": "recommendations",
+        },
+        "inline": {
+            "Activité auditée:": "activity_description",
+            "Résumé :": "resume",
+        },
+        "rating": r"(.+?) \(Évaluation: (.+?)\)",
+        "not_specified": "Non spécifié",
+        "no_info": "Aucune information",
+        "no_positive": "Aucun point positif mentionné",
+        "no_recommendations": "Aucune recommandation fournie",
+        "no_summary": "Aucun résumé fourni",
+    },
+    "en": {
+        "fields": [
+            (("client_name", "client_address"), r"Audit of (.+?) \((.+?)\)"),
+            (("start_date", "end_date"), r"conducted from (.+?) to (.+?) according"),
+            (("reference_standard",), r"according to the (.+?)\."),
+            (("audit_type",), r"Audit Type: (.+)"),
+            (("auditor_name",), r"Lead Auditor: (.+)"),
+            (("audit_manager",), r"Audit Manager: (.+)"),
+            (("audit_team_members",), r"Audit Team: (.+)"),
+            (("management_system",), r"Management System: (.+)"),
+            (("non_conformities_count",), r"Non-conformities detected: (\d+)"),
+        ],
+        "sections": {
+            "Details of non-conformities:": "compliance",
+            "Reference Documents:": "reference_documents",
+            "Audited Processes:": "processes_list",
+            "Positive Points:": "positive_points",
+            "General Recommendations:": "recommendations",
+        },
+        "inline": {
+            "Audited Activity:": "activity_description",
+            "Summary:": "resume",
+        },
+        "rating": r"(.+?) \(Rating: (.+?)\)",
+        "not_specified": "Not specified",
+        "no_info": "No information",
+        "no_positive": "No positive points mentioned",
+        "no_recommendations": "No recommendations provided",
+        "no_summary": "No summary provided",
+    },
+}
+
+LIST_SECTIONS = ("reference_documents", "processes_list", "positive_points", "recommendations")
+PROCESS_PATTERN = re.compile(r"(.+?) \((.+?)\)")
+LIST_ITEM = re.compile(r"^[ \t]*- (.*)$", re.MULTILINE)
+ITEM_LINE = re.compile(r"^[ \t]*(-.*)$", re.MULTILINE)
+
+
+class SummaryParser:
+    """Parser for summaries written in the prompt's structure, for one language.
+
+    All patterns are compiled once. Each header field is found with a single
+    search; one multiline scan locates every section and inline header, and list
+    items are pulled out of each section body with one ``findall``, so no Python
+    code runs per line except for non-conformity entries. Instances are stateless
+    and can be shared, e.g. to re-parse stored summaries in bulk.
+    """
+
+    def __init__(self, language="fr"):
+        table = LANGUAGE_TABLES["en" if language == "en" else "fr"]
+        self.table = table
+        self.fields = [(names, re.compile(pattern)) for names, pattern in table["fields"]]
+        self.headers = {**table["sections"], **table["inline"]}
+        self.inline = set(table["inline"].values())
+        prefixes = "|".join(re.escape(prefix) for prefix in sorted(self.headers, key=len, reverse=True))
+        self.header_pattern = re.compile(rf"^[ \t]*({prefixes})(.*)$", re.MULTILINE)
+        self.rating_pattern = re.compile(table["rating"])
+
+    def parse(self, summary):
+        """Return the structured data of ``summary`` (same shape as the report generators expect)."""
+        table = self.table
+        not_specified = table["not_specified"]
+        values = {}
+        for names, pattern in self.fields:
+            match = pattern.search(summary)
+            if match:
+                values.update(zip(names, match.groups()))
+
+        lists = {name: [] for name in LIST_SECTIONS}
+        compliance_items = []
+        headers = list(self.header_pattern.finditer(summary))
+        for index, header in enumerate(headers):
+            kind = self.headers[header.group(1)]
+            if kind in self.inline:
+                values[kind] = header.group(2).strip()
+                continue
+            body_end = headers[index + 1].start() if index + 1 < len(headers) else len(summary)
+            body = summary[header.end():body_end]
+            if kind == "compliance":
+                compliance_items.extend(self._compliance_item(line.strip()) for line in ITEM_LINE.findall(body))
+            else:
+                lists[kind].extend(item for item in map(str.strip, LIST_ITEM.findall(body)) if item)
+
+        def field(name):
+            return values.get(name, not_specified)
+
+        return {
+            "client_name": field("client_name"),
+            "client_address": field("client_address"),
+            "audit_period": f"{field('start_date')} - {field('end_date')}",
+            "reference_standard": field("reference_standard"),
+            "audit_type": field("audit_type"),
+            "auditor_name": field("auditor_name"),
+            "audit_manager": field("audit_manager"),
+            "audit_team_members": field("audit_team_members"),
+            "management_system": field("management_system"),
+            "non_conformities_count": values.get("non_conformities_count", "0"),
+            "reference_documents": lists["reference_documents"] or [not_specified],
+            "activity_description": values.get("activity_description") or not_specified,
+            "processes_list": lists["processes_list"] or [not_specified],
+            "compliance_items": compliance_items or [
+                {"process": not_specified, "requirement": "N/A", "comment": table["no_info"], "rating": "N/A"}
+            ],
+            "positive_points": lists["positive_points"] or [table["no_positive"]],
+            "recommendations": lists["recommendations"] or [table["no_recommendations"]],
+            "resume": values.get("resume") or table["no_summary"],
+        }
+
+    def _compliance_item(self, line):
+        """Parse "- Process (Requirement): Comment (Rating: X)"; missing parts get placeholders."""
+        not_specified = self.table["not_specified"]
+        process_requirement, _, comment_rating = line[2:].partition(":")
+        process_requirement = process_requirement.strip()
+        comment_rating = comment_rating.strip() or self.table["no_info"]
+        process_match = PROCESS_PATTERN.match(process_requirement)
+        comment_match = self.rating_pattern.match(comment_rating)
+        return {
+            "process": process_match.group(1) if process_match else process_requirement,
+            "requirement": process_match.group(2) if process_match else not_specified,
+            "comment": comment_match.group(1) if comment_match else comment_rating,
+            "rating": comment_match.group(2) if comment_match else not_specified,
+        }
+
+
+PARSERS = {language: SummaryParser(language) for language in LANGUAGE_TABLES}
+
+
+def parse_summary(summary, language="fr"):
+    """Parse a summary written in the prompt's structure into structured data."""
+    return PARSERS["en" if language == "en" else "fr"].parse(summary)
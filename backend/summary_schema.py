@@ -0,0 +1,96 @@
+# summary_schema.py
+from typing import List, Optional, Union
+from pydantic import BaseModel, field_validator
+from summary_parser import LANGUAGE_TABLES
+
+
+class ComplianceItem(BaseModel):
+    process: str
+    requirement: Optional[str] = None
+    comment: Optional[str] = None
+    rating: Optional[str] = None
+
+
+class AuditSummary(BaseModel):
+    """Schema of the JSON object returned by the model in structured-output mode.
+
+    Every field is optional so a partial answer still validates; missing values
+    are filled with the usual placeholders by ``to_structured_data``.
+    """
+
+    client_name: Optional[str] = None
+    client_address: Optional[str] = None
+    audit_period: Optional[str] = None
+    reference_standard: Optional[str] = None
+    audit_type: Optional[str] = None
+    auditor_name: Optional[str] = None
+    audit_manager: Optional[str] = None
+    audit_team_members: Optional[Union[str, List[str]]] = None
+    management_system: Optional[str] = None
+    non_conformities_count: Optional[Union[int, str]] = None
+    compliance_items: List[ComplianceItem] = []
+    reference_documents: List[str] = []
+    activity_description: Optional[str] = None
+    processes_list: List[str] = []
+    positive_points: List[str] = []
+    recommendations: List[str] = []
+    resume: Optional[str] = None
+
+    @field_validator("reference_documents", "processes_list", "positive_points", "recommendations",
+                     mode="before")
+    @classmethod
+    def _single_item_list(cls, value):
+        return [value] if isinstance(value, str) else value or []
+
+    @field_validator("compliance_items", mode="before")
+    @classmethod
+    def _no_items(cls, value):
+        return value or []
+
+    def to_structured_data(self, language="fr"):
+        """The ``structured_data`` dict used by the endpoints and report generators."""
+        table = LANGUAGE_TABLES["en" if language == "en" else "fr"]
+        not_specified = table["not_specified"]
+
+        def text(value):
+            value = value.strip() if isinstance(value, str) else value
+            return value or not_specified
+
+        def items(values):
+            return [value.strip() for value in values if value and value.strip()]
+
+        team = self.audit_team_members
+        if isinstance(team, list):
+            team = ", ".join(items(team))
+        compliance_items = [
+            {"process": text(item.process), "requirement": text(item.requirement),
+             "comment": text(item.comment), "rating": text(item.rating)}
+            for item in self.compliance_items
+        ]
+        count = str(self.non_conformities_count).strip() if self.non_conformities_count is not None else ""
+        if not count.isdigit():
+            count = str(len(compliance_items))
+        period = text(self.audit_period)
+        if " - " not in period:
+            period = f"{period} - {not_specified}"
+        return {
+            "client_name": text(self.client_name),
+            "client_address": text(self.client_address),
+            "audit_period": period,
+            "reference_standard": text(self.reference_standard),
+            "audit_type": text(self.audit_type),
+            "auditor_name": text(self.auditor_name),
+            "audit_manager": text(self.audit_manager),
+            "audit_team_members": text(team),
+            "management_system": text(self.management_system),
+            "non_conformities_count": count,
+            "reference_documents": items(self.reference_documents) or [not_specified],
+            "activity_description": text(self.activity_description),
+            "processes_list": items(self.processes_list) or [not_specified],
+            "compliance_items": compliance_items or [
+                {"process": not_specified, "requirement": "N/A", "comment": table["no_info"], "rating": "N/A"}
+            ],
+            "positive_points": items(self.positive_points) or [table["no_positive"]],
+            "recommendations": items(self.recommendations) or [table["no_recommendations"]],
+            "resume": (self.resume or "").strip() or table["no_summary"],
+        }
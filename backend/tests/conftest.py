@@ -0,0 +1,7 @@
+# conftest.py
+import os
+import sys
+
+# Backend modules import each other as top-level modules, as when started from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "test")
@@ -0,0 +1,56 @@
+# test_answer_cache.py
+import pytest
+from answer_cache import AnswerCache, question_terms, refers_back
+
+CONTEXT = "context-hash"
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(max_entries=10, ttl=60, similarity=0.5)
+
+
+def test_rephrased_question_reuses_the_answer(cache):
+    cache.set(CONTEXT, "Quels sont les processus non conformes ?", "answer")
+    assert cache.get(CONTEXT, "quels processus non conformes") == "answer"
+    assert cache.get("other-context", "quels processus non conformes") is None
+
+
+def test_plurals_are_folded():
+    assert question_terms("Les écarts des processus") == question_terms("l'écart du processus")
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Quels processus ont plus d'écarts ?", "Quels processus ont moins d'écarts ?"),
+    ("Les audits avec écarts majeurs", "Les audits sans écarts majeurs"),
+    ("Which processes had more findings?", "Which processes had less findings?"),
+    ("Which processes had findings?", "Which processes had no findings?"),
+    ("Quels processus sont conformes ?", "Quels processus ne sont pas conformes ?"),
+])
+def test_negations_and_comparisons_do_not_share_answers(cache, cached, asked):
+    cache.set(CONTEXT, cached, "answer")
+    assert cache.get(CONTEXT, asked) is None
+    assert cache.get(CONTEXT, cached) == "answer"
+
+
+def test_meaning_words_are_not_folded():
+    assert {"plus", "moins", "sans", "less"} <= question_terms("plus moins sans less")
+    assert question_terms("n'est pas conforme") == question_terms("ne sont pas conformes")
+
+
+def test_follow_up_questions_refer_back():
+    assert refers_back("Et pour ce processus ?")
+    assert refers_back("What about it?")
+    assert not refers_back("Est-ce que la production est conforme ?")
+    assert not refers_back("Y a-t-il des écarts ?")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2, ttl=60, similarity=1)
+    cache.set(CONTEXT, "processus achats conformes", "a")
+    cache.set(CONTEXT, "processus production conformes", "b")
+    assert cache.get(CONTEXT, "processus achats conformes") == "a"
+    cache.set(CONTEXT, "processus maintenance conformes", "c")
+    assert cache.get(CONTEXT, "processus production conformes") is None
+    assert cache.get(CONTEXT, "processus achats conformes") == "a"
+    assert cache.evictions == 1
@@ -0,0 +1,65 @@
+# test_audio_buffers.py
+import numpy as np
+from capture import AudioStore, FrameRingBuffer
+
+
+def drain(ring):
+    chunks = []
+    ring.read_into(lambda view: chunks.append(view.copy()))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+
+
+def test_ring_buffer_wraps_around():
+    ring = FrameRingBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    assert list(drain(ring)) == list(range(6))
+    ring.write(np.arange(6, 12, dtype=np.int16))  # Crosses the end of the buffer
+    assert list(drain(ring)) == list(range(6, 12))
+    assert ring.size == 0 and ring.high_water == 6
+
+
+def test_full_ring_buffer_drops_and_counts_new_frames():
+    ring = FrameRingBuffer(4)
+    assert ring.write(np.arange(3, dtype=np.int16)) == 0
+    assert ring.write(np.arange(3, 6, dtype=np.int16)) == 2
+    assert list(drain(ring)) == [0, 1, 2, 3]
+    assert ring.dropped_frames == 2
+
+
+def test_audio_store_views_within_and_across_blocks():
+    store = AudioStore(4)
+    store.append(np.arange(3, dtype=np.int16))
+    store.append(np.arange(3, 10, dtype=np.int16))
+    assert store.length == 10 and len(store.blocks) == 3
+
+    view = store.view(4, 7)
+    assert list(view) == [4, 5, 6]
+    assert np.shares_memory(view, store.blocks[1])  # Zero-copy within one block
+    assert list(store.view(2, 9)) == list(range(2, 9))
+    assert [list(block) for block in store.iter_blocks(2, 9)] == [[2, 3], [4, 5, 6, 7], [8]]
+
+
+def test_released_blocks_keep_outstanding_views_valid():
+    store = AudioStore(4)
+    store.append(np.arange(10, dtype=np.int16))
+    view = store.view(0, 4)
+    store.release_before(8)
+    assert store.blocks[0] is None and store.blocks[1] is None
+    assert list(view) == [0, 1, 2, 3]
+    assert list(store.view(8, 10)) == [8, 9]
+    assert store.allocated_bytes == 4 * 2
+
+
+def test_ring_buffer_consumer_runs_outside_the_lock():
+    ring = FrameRingBuffer(8)
+    ring.write(np.arange(5, dtype=np.int16))
+    chunks = []
+
+    def consume(view):
+        assert not ring.lock.locked()
+        ring.write(np.arange(5, 8, dtype=np.int16))  # The callback keeps writing meanwhile
+        chunks.append(view.copy())
+
+    assert ring.read_into(consume) == 5
+    assert list(chunks[0]) == [0, 1, 2, 3, 4]
+    assert list(drain(ring)) == [5, 6, 7]
@@ -0,0 +1,90 @@
+# test_capture.py
+import wave
+import numpy as np
+from capture import CapturePipeline, IncrementalWavWriter, recover_wav
+
+SAMPLE_RATE = 16000
+BLOCK_SECONDS = 0.1
+
+
+async def ignore_segment(segment_audio, segment_number, start_time):
+    pass
+
+
+def make_pipeline(tmp_path, segment_duration=30):
+    pipeline = CapturePipeline(SAMPLE_RATE, segment_duration, ignore_segment, str(tmp_path / "recording_test.wav"),
+                               vad=True, adaptive=False, max_pending_segments=16)
+    pipeline.writer = IncrementalWavWriter(pipeline.recording_path, SAMPLE_RATE)
+    return pipeline
+
+
+def feed(pipeline, seconds, speech, rng):
+    """Push ``seconds`` of speech-like tone or low noise through the audio callback, as the cutter task would see it."""
+    frames = int(SAMPLE_RATE * BLOCK_SECONDS)
+    for _ in range(round(seconds / BLOCK_SECONDS)):
+        if speech:
+            samples = 8000 * np.sin(2 * np.pi * 220 * np.arange(frames) / SAMPLE_RATE)
+        else:
+            samples = rng.normal(0, 20, frames)
+        pipeline.audio_callback(samples.astype(np.int16).reshape(-1, 1), frames, None, None)
+        pipeline._drain_ring()
+        pipeline._cut_on_pauses()
+
+
+def queued_segments(pipeline):
+    segments = []
+    while not pipeline.segments.empty():
+        segments.append(pipeline.segments.get_nowait())
+    return segments
+
+
+def test_short_utterance_is_cut_at_the_following_pause(tmp_path):
+    rng = np.random.default_rng(0)
+    pipeline = make_pipeline(tmp_path)
+    feed(pipeline, 3, False, rng)
+    feed(pipeline, 2, True, rng)
+    feed(pipeline, 40, False, rng)
+    pipeline.writer.close()
+
+    segments = queued_segments(pipeline)
+    assert len(segments) == 1
+    _, start_time, audio = segments[0]
+    assert 2.5 <= start_time <= 3
+    assert len(audio) / SAMPLE_RATE < 3.5
+    assert pipeline.cut_reasons == {"pause": 1, "max_length": 0, "final": 0}
+    assert pipeline.skipped_samples > 35 * SAMPLE_RATE
+
+
+def test_continuous_speech_is_cut_at_the_maximum_length(tmp_path):
+    rng = np.random.default_rng(0)
+    pipeline = make_pipeline(tmp_path, segment_duration=10)
+    feed(pipeline, 0.5, False, rng)  # Room noise first, so the VAD has a noise floor
+    feed(pipeline, 25, True, rng)
+    pipeline.writer.close()
+
+    segments = queued_segments(pipeline)
+    assert len(segments) == 2
+    # Cuts fall on VAD frame boundaries, so a segment may be one frame short of segment_duration
+    assert all(10 * SAMPLE_RATE - pipeline.vad.frame_length <= len(audio) <= 10 * SAMPLE_RATE
+               for _, _, audio in segments)
+    assert pipeline.cut_reasons["max_length"] == 2
+
+
+def test_recover_wav_patches_an_unclosed_recording(tmp_path):
+    path = str(tmp_path / "recording_test.wav")
+    writer = IncrementalWavWriter(path, SAMPLE_RATE)
+    writer.write(np.ones(SAMPLE_RATE, dtype=np.int16))
+    writer.flush()  # Left unclosed, as after a crash
+
+    assert recover_wav(path)
+    with wave.open(path, "rb") as wf:
+        assert wf.getnframes() == SAMPLE_RATE
+    assert not recover_wav(path)
+
+
+def test_recover_wav_leaves_an_empty_recording_alone(tmp_path):
+    path = str(tmp_path / "recording_test.wav")
+    writer = IncrementalWavWriter(path, SAMPLE_RATE)
+    writer.flush()
+
+    assert not recover_wav(path)
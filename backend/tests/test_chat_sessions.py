@@ -0,0 +1,30 @@
+# test_chat_sessions.py
+import asyncio
+import pytest
+from fastapi import HTTPException
+from chat_sessions import ChatSessionStore
+
+
+def test_full_store_evicts_the_least_recently_used_idle_session():
+    async def run():
+        store = ChatSessionStore(max_sessions=2)
+        busy = store.create()
+        idle = store.create()
+        await busy.lock.acquire()  # Oldest, but answering a question
+        session = store.create()
+        return store, busy, idle, session
+
+    store, busy, idle, session = asyncio.run(run())
+    assert set(store.sessions) == {busy.session_id, session.session_id}
+    assert store.evicted == 1
+
+
+def test_full_store_rejects_new_sessions_while_all_are_busy():
+    async def run():
+        store = ChatSessionStore(max_sessions=1)
+        await store.create().lock.acquire()
+        store.create()
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.status_code == 429
@@ -0,0 +1,72 @@
+# test_chunking.py
+import asyncio
+import os
+import wave
+import numpy as np
+from chunking import plan_chunks, merge_chunk_segments, transcribe_in_chunks, FRAME_SECONDS
+
+SAMPLE_RATE = 8000
+
+
+def write_wav(path, seconds):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(np.full(int(seconds * SAMPLE_RATE), 1000, dtype=np.int16).tobytes())
+
+
+def test_plan_chunks_cuts_on_the_quietest_frame_before_the_boundary():
+    duration = 25.0
+    energies = np.ones(int(duration / FRAME_SECONDS))
+    energies[int(8.5 / FRAME_SECONDS)] = 0.0  # Pause 1.5 s before the first boundary
+    spans = plan_chunks(energies, duration, chunk_seconds=10, search_seconds=3)
+    assert spans[0] == (0.0, 8.5)
+    assert spans[-1][1] == duration
+    assert all(end - start <= 10 for start, end in spans)
+    assert all(previous[1] == following[0] for previous, following in zip(spans, spans[1:]))
+
+
+def test_plan_chunks_keeps_a_short_recording_whole():
+    assert plan_chunks(np.ones(100), 2.0, chunk_seconds=10) == [(0.0, 2.0)]
+
+
+def test_merge_drops_overlap_segments_owned_by_the_neighbouring_chunk():
+    merged = merge_chunk_segments([
+        (0.0, 10.0, 0.0, [{"start": 1.0, "end": 4.0, "text": "first"},
+                          {"start": 9.5, "end": 11.5, "text": "boundary"}]),
+        (10.0, 20.0, 8.0, [{"start": 0.5, "end": 1.5, "text": "overlap"},
+                           {"start": 1.5, "end": 3.5, "text": "Boundary"},
+                           {"start": 4.0, "end": 6.0, "text": "second"}]),
+    ])
+    assert [segment["text"] for segment in merged] == ["first", "Boundary", "second"]
+    assert merged[1] == {"start": 9.5, "end": 11.5, "text": "Boundary"}
+    assert merged[2] == {"start": 12.0, "end": 14.0, "text": "second"}
+
+
+def test_concurrent_calls_in_one_work_dir_keep_their_chunks(tmp_path):
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    paths = []
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        path = tmp_path / name / "meeting.wav"
+        write_wav(path, 25 + len(paths) * 10)
+        paths.append(str(path))
+
+    async def transcribe(chunk_path, language):
+        await asyncio.sleep(0.01)  # Let the other call write its chunks meanwhile
+        with wave.open(chunk_path, "rb") as wf:
+            seconds = wf.getnframes() / wf.getframerate()
+        return [{"start": 0.0, "end": seconds, "text": os.path.relpath(chunk_path, work_dir)}]
+
+    async def run():
+        return await asyncio.gather(*[
+            transcribe_in_chunks(path, transcribe, str(work_dir), chunk_seconds=10, overlap=1) for path in paths
+        ])
+
+    first, second = asyncio.run(run())
+    assert len(first) > 1 and len(second) > 1
+    directories = [{os.path.dirname(segment["text"]) for segment in segments} for segments in (first, second)]
+    assert len(directories[0]) == len(directories[1]) == 1 and directories[0] != directories[1]
+    assert os.listdir(work_dir) == []
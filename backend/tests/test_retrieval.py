@@ -0,0 +1,40 @@
+# test_retrieval.py
+from retrieval import TranscriptIndex, tokenize
+
+LINES = [
+    "Nous commençons l'audit par le processus achats et la sélection des fournisseurs.\n",
+    "La production suit le planning, les machines sont entretenues chaque semaine.\n",
+    "Les fournisseurs critiques ne sont pas réévalués depuis deux ans, c'est un écart.\n",
+    "La maintenance tient un registre des interventions sur les presses.\n",
+    "Le service qualité traite les réclamations clients sous dix jours.\n",
+    "Les formations des opérateurs de production sont enregistrées.\n",
+]
+
+
+def make_index():
+    # One line per passage
+    return TranscriptIndex("".join(LINES), passage_chars=100)
+
+
+def test_tokenize_drops_accents_and_stopwords():
+    assert tokenize("Les Écarts de la Production") == ["ecarts", "production"]
+
+
+def test_search_ranks_passages_by_relevance():
+    index = make_index()
+    assert len(index.passages) == len(LINES)
+    assert index.search("Réévaluation des fournisseurs critiques", top_k=2) == [2, 0]
+    assert index.search("registre de maintenance", top_k=1) == [3]
+    assert index.search("sans rapport", top_k=3) == []
+
+
+def test_context_keeps_transcript_order():
+    index = make_index()
+    context = index.context("fournisseurs critiques", top_k=2)
+    assert context == LINES[0].strip() + "\n[...]\n" + LINES[2].strip()
+
+
+def test_context_falls_back_to_the_opening_or_whole_transcript():
+    index = make_index()
+    assert index.context("sans rapport", top_k=2) == LINES[0].strip() + "\n[...]\n" + LINES[1].strip()
+    assert index.context("n'importe quoi", top_k=len(LINES)) == "".join(LINES)
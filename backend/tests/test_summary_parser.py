@@ -0,0 +1,68 @@
+# test_summary_parser.py
+import pytest
+from bench_summary_parser import legacy_parse_summary, sample_summary
+from summary_parser import parse_summary
+
+FRENCH_SUMMARY = """Audit de ACME Industries (12 rue du Port, Lyon) mené du 3 mars 2024 au 5 mars 2024 selon la norme ISO 9001:2015.
+
+Type d’audit: Audit interne
+Auditeur Principal: Jeanne Martin
+Équipe d’audit: Jeanne Martin, Omar Ali
+Non-conformités détectées: 2
+
+Détails des non-conformités :
+- Achats (8.4.1): Évaluation des fournisseurs absente (Évaluation: Majeure)
+- Production: Enregistrements incomplets
+
+Processus audités :
+- Achats
+- Production
+
+Activité auditée: Fabrication de pièces métalliques
+Résumé : Le système est globalement efficace.
+"""
+
+
+def test_french_summary_fields_and_sections():
+    data = parse_summary(FRENCH_SUMMARY, "fr")
+    assert data["client_name"] == "ACME Industries"
+    assert data["client_address"] == "12 rue du Port, Lyon"
+    assert data["audit_period"] == "3 mars 2024 - 5 mars 2024"
+    assert data["reference_standard"] == "ISO 9001:2015"
+    assert data["audit_type"] == "Audit interne"  # Curly apostrophe as written by the prompt
+    assert data["audit_team_members"] == "Jeanne Martin, Omar Ali"
+    assert data["audit_manager"] == "Non spécifié"
+    assert data["non_conformities_count"] == "2"
+    assert data["processes_list"] == ["Achats", "Production"]
+    assert data["compliance_items"] == [
+        {"process": "Achats", "requirement": "8.4.1", "comment": "Évaluation des fournisseurs absente",
+         "rating": "Majeure"},
+        {"process": "Production", "requirement": "Non spécifié", "comment": "Enregistrements incomplets",
+         "rating": "Non spécifié"},
+    ]
+    assert data["activity_description"] == "Fabrication de pièces métalliques"
+    assert data["resume"] == "Le système est globalement efficace."
+
+
+@pytest.mark.parametrize("language, not_specified, no_summary", [
+    ("fr", "Non spécifié", "Aucun résumé fourni"),
+    ("en", "Not specified", "No summary provided"),
+])
+def test_empty_summary_gets_placeholders(language, not_specified, no_summary):
+    data = parse_summary("", language)
+    assert data["client_name"] == not_specified
+    assert data["non_conformities_count"] == "0"
+    assert data["processes_list"] == [not_specified]
+    assert data["compliance_items"][0]["process"] == not_specified
+    assert data["resume"] == no_summary
+
+
+@pytest.mark.parametrize("language", ["fr", "en"])
+def test_matches_the_previous_parser(language):
+    summary = sample_summary(language, 5)
+    current = parse_summary(summary, language)
+    legacy = legacy_parse_summary(summary, language)
+    # The previous parser never found the standard in English summaries
+    differences = {key for key in legacy if legacy[key] != current[key]}
+    assert differences == ({"reference_standard"} if language == "en" else set())
+    assert current["reference_standard"] == "ISO 9001:2015"
@@ -0,0 +1,156 @@
+# test_upstream.py
+import asyncio
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from groq import APITimeoutError, RateLimitError
+import upstream
+from upstream import UpstreamClient, TRANSCRIPTION_MODEL, PRIORITY_LIVE, PRIORITY_SUMMARY
+
+MODEL = "test-model"
+REQUEST = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+
+
+@pytest.fixture
+def client():
+    return UpstreamClient()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upstream, "GROQ_BACKOFF_BASE", 0.0)
+
+
+def rate_limited(retry_after):
+    response = httpx.Response(429, headers={"retry-after": str(retry_after)}, request=REQUEST)
+    return RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def fake_chat(client, create):
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def fake_transcriptions(client, create):
+    client.client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+
+
+def test_transcribe_times_only_the_request(client, tmp_path):
+    audio_path = tmp_path / "segment.flac"
+    audio_path.write_bytes(b"audio")
+    timings = []
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(segments=[])
+
+    async def run():
+        lane = client._lane(TRANSCRIPTION_MODEL)
+        lane.bucket.rate = 100
+        lane.bucket.block(0.2)  # Queueing time must not count as request time
+        return await client.transcribe(str(audio_path), "fr", on_response=timings.append)
+
+    fake_transcriptions(client, create)
+    asyncio.run(run())
+    assert len(timings) == 1
+    assert 0.05 <= timings[0] < 0.15
+
+
+def test_waiting_calls_run_in_priority_order(client):
+    order = []
+
+    def request(name, hold=None):
+        async def call():
+            order.append(name)
+            if hold:
+                await hold.wait()
+            return name
+        return call
+
+    async def run():
+        client._lane(MODEL).limit = 1
+        hold = asyncio.Event()
+        first = asyncio.create_task(client._call(MODEL, request("first", hold), PRIORITY_SUMMARY))
+        await asyncio.sleep(0.01)
+        summary = asyncio.create_task(client._call(MODEL, request("summary"), PRIORITY_SUMMARY))
+        live = asyncio.create_task(client._call(MODEL, request("live"), PRIORITY_LIVE))
+        await asyncio.sleep(0.01)
+        assert client._lane(MODEL).waiting_by_priority() == {"summary": 1, "live": 1}
+        hold.set()
+        return await asyncio.gather(first, summary, live)
+
+    assert asyncio.run(run()) == ["first", "summary", "live"]
+    assert order == ["first", "live", "summary"]
+
+
+def test_retry_after_blocks_the_lane(client):
+    starts = []
+    errors = [rate_limited(0.3)]
+
+    def request(name):
+        async def call():
+            starts.append((name, time.monotonic()))
+            if name == "limited" and errors:
+                raise errors.pop()
+            return name
+        return call
+
+    async def run():
+        client._lane(MODEL).bucket.rate = 100  # Only the Retry-After pause holds calls back
+        started = time.monotonic()
+        limited = asyncio.create_task(client._call(MODEL, request("limited")))
+        await asyncio.sleep(0.05)
+        other = await client._call(MODEL, request("other"))
+        return started, await limited, other
+
+    started, *results = asyncio.run(run())
+    assert results == ["limited", "other"]
+    # The other call arrived during the Retry-After pause and was held back as well
+    assert sorted(name for name, _ in starts) == ["limited", "limited", "other"]
+    assert all(at - started >= 0.29 for _, at in starts[1:])
+    assert client.stats[MODEL]["rate_limited"] == 1
+
+
+def test_exhausted_retries_raise_the_last_error(client, monkeypatch):
+    monkeypatch.setattr(upstream, "GROQ_MAX_RETRIES", 2)
+    raised = []
+
+    async def create(**kwargs):
+        raised.append(APITimeoutError(request=REQUEST))
+        raise raised[-1]
+
+    fake_chat(client, create)
+    with pytest.raises(APITimeoutError) as excinfo:
+        asyncio.run(client.chat([{"role": "user", "content": "?"}], model=MODEL))
+    assert len(raised) == 3
+    assert excinfo.value is raised[-1]
+    stats = client.stats[MODEL]
+    assert (stats["retries"], stats["failed"], stats["completed"]) == (2, 1, 0)
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_identical_calls_are_coalesced(client, fails):
+    calls = []
+    response = SimpleNamespace(text="answer")
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        if fails:
+            raise ValueError("upstream error")
+        return response
+
+    async def run():
+        messages = [{"role": "user", "content": "Quels processus sont conformes ?"}]
+        return await asyncio.gather(*[client.chat(messages, model=MODEL) for _ in range(3)], return_exceptions=True)
+
+    fake_chat(client, create)
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert client.stats[MODEL]["coalesced"] == 2
+    if fails:
+        assert all(isinstance(result, ValueError) for result in results)
+        assert results[0] is results[1] is results[2]
+    else:
+        assert results == [response] * 3
+    assert client.pending == {}
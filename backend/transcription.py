@@ -1,155 +1,311 @@
 import os
 import time
-import queue
-import numpy as np
 import sounddevice as sd
 import wave
 import tempfile
+import shutil
 import asyncio
-from groq import Groq
-from fastapi import HTTPException, UploadFile
+import hashlib
+import json
+import uuid
+from fastapi import HTTPException
+from capture import CapturePipeline
+from chunking import transcribe_in_chunks
+from upstream import upstream, TRANSCRIPTION_MODEL, PRIORITY_LIVE, PRIORITY_BATCH
+from cache import transcription_cache, file_sha256
+from summarization import update_rolling_summary, render_summary
+from audio_codec import encode_audio, record_upload, AUDIO_UPLOAD_CODEC, AUDIO_STORAGE_CODEC
+from history_store import HistoryStore
+from upload_stream import MultipartUpload
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# "stitched" builds the final transcript from the live segments, "full" re-transcribes the saved recording
+FINAL_TRANSCRIPTION_MODE = os.environ.get("FINAL_TRANSCRIPTION_MODE", "stitched")
+# Re-transcribe the full recording in the background and replace the stitched transcript when done.
+# Off by default since it pays Whisper a second time; enable with REFINE_FINAL_TRANSCRIPTION=1 or ?refine=true
+REFINE_FINAL_TRANSCRIPTION = os.environ.get("REFINE_FINAL_TRANSCRIPTION", "0") == "1"
+# Uploads are streamed to disk in chunks of this size and rejected past the size limit
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", str(1024 * 1024 * 1024)))
+UPLOAD_FORM_OVERHEAD = 64 * 1024  # Allowance for the multipart headers and boundaries in Content-Length
+# Keep a rolling summary while recording (off by default, it costs a Llama call every
+# LIVE_SUMMARY_SEGMENTS segments); /start_recording?live_summary= turns it on per recording
+LIVE_SUMMARY = os.environ.get("LIVE_SUMMARY", "0") == "1"
+LIVE_SUMMARY_SEGMENTS = int(os.environ.get("LIVE_SUMMARY_SEGMENTS", "6"))
+
+
+def format_timestamp(seconds):
+    """Format seconds as MM:SS.mmm (minutes keep counting past the hour)."""
+    millis = int(round(seconds * 1000))
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def public_segment(item):
+    """The client-facing view of a live segment (without the raw Whisper segments)."""
+    return {key: item[key] for key in ("segment", "transcription", "timestamp", "start")}
+
+
+def format_segments(segments, offset=0.0):
+    """Render Whisper segments as timestamped lines, shifted by ``offset`` seconds."""
+    transcription_text = ""
+    for segment in segments:
+        start_str = format_timestamp(segment["start"] + offset)
+        end_str = format_timestamp(segment["end"] + offset)
+        transcription_text += f"[{start_str} → {end_str}] {segment['text']}\n"
+    return transcription_text
+
+
 class TranscriptionService:
-    def __init__(self):
+    """Recording and transcription state for one session.
+
+    Each session has its own language, capture buffers and live transcripts; the
+    history store is shared between sessions.
+    """
+
+    def __init__(self, session_id="default", history=None, language="fr"):
+        self.session_id = session_id
+        self.created = time.time()
+        self.last_active = time.monotonic()
         self.recording = False
-        self.audio_queue = queue.Queue()
-        self.full_audio = []
         self.sample_rate = 16000
         self.temp_dir = tempfile.mkdtemp()
-        self.segment_duration = 10  # 10 seconds per segment
-        self.segment_counter = 0
-        self.current_segment_audio = []
+        self.segment_duration = 10  # Initial maximum seconds per live segment (adapted while recording)
+        self.capture = None  # CapturePipeline for the current recording
         self.stream = None
         self.session_dir = None  # Initialized per session
-        self.client = Groq()
         self.transcription_text = ""
-        self.history = []  # List of dicts: {"filename": str, "audio_path": str, "transcription": str, "timestamp": str}
+        self.history = history or HistoryStore()  # Persistent history of transcriptions (SQLite), shared
         self.real_time_transcriptions = []  # List of transcriptions for current recording session
-        self.transcription_language = "fr"  # Default language is French
+        self.segment_subscribers = set()  # asyncio.Queue per streaming client, fed as segments complete
+        self.transcription_language = language  # Default language is French
+        self.refinement_tasks = set()  # Background full-audio transcriptions replacing stitched ones
+        self.active_uploads = {}  # partial path -> {"filename", "bytes_received", "expected_bytes", "started"}
+        self.active_transcriptions = 0  # File transcriptions in progress (uploads, full recordings)
+        self.upload_stats = {"completed": 0, "rejected": 0, "bytes": 0, "seconds": 0.0, "last_throughput": None}
+        self.live_summary_enabled = False  # Whether the current recording keeps a live summary
+        self.live_summary = None  # Rolling structured summary of the current recording
+        self.live_summary_segments = 0  # Number of live segments folded into it
+        self.live_summary_transcripts = set()  # Final transcripts the live summary stands for
+        self.live_summary_task = None
+        self.live_summary_lock = asyncio.Lock()
+
+    def touch(self):
+        """Mark the session as active so it is not evicted."""
+        self.last_active = time.monotonic()
 
     def _ensure_session_dir(self):
         if not self.session_dir:
-            self.session_dir = os.path.join("recordings", time.strftime("%Y%m%d_%H%M%S"))
+            # The session id suffix keeps directories apart when sessions start in the same second
+            self.session_dir = os.path.join("recordings", f"{time.strftime('%Y%m%d_%H%M%S')}_{self.session_id[:8]}")
             os.makedirs(self.session_dir, exist_ok=True)
         return self.session_dir
 
-    async def save_uploaded_file(self, file: UploadFile):
-        """Save an uploaded audio file to the session directory."""
+    async def save_uploaded_file(self, upload: MultipartUpload):
+        """Stream an uploaded audio file to the session directory while it is received.
+
+        The request body is parsed as it arrives, so progress reflects the client's
+        upload and files larger than MAX_UPLOAD_SIZE are rejected as soon as they
+        cross the limit (or up front, from Content-Length). Data is written in
+        UPLOAD_CHUNK_SIZE blocks and the SHA-256 is computed on the fly.
+
+        Returns:
+            dict with "audio_path", "filename", "size" and "sha256"
+        """
+        if upload.content_length and upload.content_length > MAX_UPLOAD_SIZE + UPLOAD_FORM_OVERHEAD:
+            self.upload_stats["rejected"] += 1
+            raise HTTPException(status_code=413, detail=f"Uploaded file exceeds {MAX_UPLOAD_SIZE} bytes")
+        session_dir = self._ensure_session_dir()
+        # Written under a temporary name: the filename is only known once the part headers arrive
+        partial_path = os.path.join(session_dir, f".upload_{uuid.uuid4().hex}.part")
+        progress = {"filename": None, "bytes_received": 0, "expected_bytes": upload.content_length,
+                    "started": time.perf_counter()}
+        self.active_uploads[partial_path] = progress
+        digest = hashlib.sha256()
+        buffer = bytearray()
         try:
-            session_dir = self._ensure_session_dir()
-            filename = file.filename if file.filename else f"uploaded_{time.strftime('%H%M%S')}.wav"
-            audio_path = os.path.join(session_dir, filename)
-            with open(audio_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            logger.debug(f"Saved uploaded file to: {audio_path}")
-            return audio_path
+            with open(partial_path, "wb") as f:
+                async for chunk in upload.chunks():
+                    progress["filename"] = upload.filename
+                    progress["bytes_received"] += len(chunk)
+                    if progress["bytes_received"] > MAX_UPLOAD_SIZE:
+                        raise HTTPException(status_code=413, detail=f"Uploaded file exceeds {MAX_UPLOAD_SIZE} bytes")
+                    digest.update(chunk)
+                    buffer += chunk
+                    if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                        await asyncio.to_thread(f.write, bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+            filename = upload.filename or f"uploaded_{time.strftime('%H%M%S')}.wav"
+            # Suffixed so two uploads of the same file name in one session never overwrite each other
+            stem, extension = os.path.splitext(filename)
+            audio_path = os.path.join(session_dir, f"{stem}_{uuid.uuid4().hex[:8]}{extension}")
+            os.replace(partial_path, audio_path)
+            elapsed = time.perf_counter() - progress["started"]
+            self.upload_stats["completed"] += 1
+            self.upload_stats["bytes"] += progress["bytes_received"]
+            self.upload_stats["seconds"] += elapsed
+            self.upload_stats["last_throughput"] = progress["bytes_received"] / elapsed if elapsed else None
+            logger.debug(f"Saved uploaded file to: {audio_path} ({progress['bytes_received']} bytes in {elapsed:.2f}s)")
+            return {"audio_path": audio_path, "filename": filename, "size": progress["bytes_received"],
+                    "sha256": digest.hexdigest()}
+        except HTTPException:
+            self.upload_stats["rejected"] += 1
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
         except Exception as e:
             logger.error(f"Error saving uploaded file: {e}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
             raise HTTPException(status_code=500, detail=f"Error saving uploaded file: {str(e)}")
+        finally:
+            del self.active_uploads[partial_path]
+
+    async def process_segment(self, segment_audio, segment_number, start_time):
+        """Process and transcribe a live audio segment (runs on the capture worker)."""
+        temp_filename = os.path.join(self.temp_dir, f"segment_{segment_number}.wav")
 
-    def audio_callback(self, indata, frames, time_info, status):
-        if status:
-            print(f"Audio error: {status}")
-        audio_data = indata.copy()
-        self.audio_queue.put(audio_data)
-        self.full_audio.append(audio_data)
-        self.current_segment_audio.append(audio_data)
-        # Check if we've collected 10 seconds of audio
-        segment_samples = self.sample_rate * self.segment_duration
-        if len(self.current_segment_audio) * frames >= segment_samples:
-            asyncio.run(self.process_segment())
-
-    async def process_segment(self):
-        """Process and transcribe a 10-second audio segment."""
-        if not self.current_segment_audio:
-            return
-        segment_audio = np.concatenate(self.current_segment_audio, axis=0)
-        self.current_segment_audio = []  # Reset for next segment
-        self.segment_counter += 1
-        temp_filename = os.path.join(self.temp_dir, f"segment_{self.segment_counter}.wav")
-        
         # Save segment to temporary file
         with wave.open(temp_filename, "wb") as wf:
             wf.setnchannels(1)
             wf.setsampwidth(2)
             wf.setframerate(self.sample_rate)
-            wf.writeframes((segment_audio * 32767).astype(np.int16).tobytes())
-        
-        # Transcribe segment
-        transcription = await self.analyze_audio_file(temp_filename, self.transcription_language)
-        self.real_time_transcriptions.append({
-            "segment": self.segment_counter,
-            "transcription": transcription,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        })
-        logger.debug(f"Transcribed segment {self.segment_counter}: {transcription[:50]}...")
-
-        # Clean up temporary file
-        os.remove(temp_filename)
-
-    async def start_recording(self):
-        """Start real-time audio recording."""
+            wf.writeframes(segment_audio)
+
+        try:
+            # Transcribe segment
+            segments = await self.transcribe_segments(temp_filename, self.transcription_language, PRIORITY_LIVE)
+            transcription = format_segments(segments)
+            item = {
+                "segment": segment_number,
+                "transcription": transcription,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "start": start_time,
+                "segments": segments
+            }
+            self.real_time_transcriptions.append(item)
+            self._publish("segment", public_segment(item))
+            self._schedule_live_summary()
+            logger.debug(f"Transcribed segment {segment_number}: {transcription[:50]}...")
+        finally:
+            # Clean up temporary file
+            os.remove(temp_filename)
+
+    async def start_recording(self, device=None, live_summary=None):
+        """Start real-time audio recording.
+
+        Args:
+            device: sounddevice input device (index or name), the default input if None
+            live_summary: keep a rolling summary while recording (LIVE_SUMMARY if None)
+        """
         logger.debug(f"Start recording called, current recording state: {self.recording}")
         if self.recording:
             logger.warning("Already recording, rejecting request")
             raise HTTPException(status_code=400, detail="Already recording")
         try:
             self.recording = True
-            self.full_audio = []
-            self.current_segment_audio = []
-            self.segment_counter = 0
+            self.capture = None
             self.real_time_transcriptions = []  # Reset real-time transcriptions
+            self._reset_live_summary()
+            self.live_summary_enabled = (LIVE_SUMMARY if live_summary is None else live_summary) \
+                and LIVE_SUMMARY_SEGMENTS > 0
             self.session_dir = None  # Reset session_dir for a new recording session
-            self._ensure_session_dir()  # Create a new session directory
+            session_dir = self._ensure_session_dir()  # Create a new session directory
+            # Audio is appended to this file as it is captured
+            recording_path = os.path.join(session_dir, f"recording_{time.strftime('%H%M%S')}.wav")
+            self.capture = CapturePipeline(
+                sample_rate=self.sample_rate,
+                segment_duration=self.segment_duration,
+                on_segment=self.process_segment,
+                recording_path=recording_path
+            )
+            await self.capture.start()
             self.stream = sd.InputStream(
+                device=device,
                 channels=1,
+                dtype="int16",
                 samplerate=self.sample_rate,
-                callback=self.audio_callback
+                callback=self.capture.audio_callback
             )
             self.stream.start()
             logger.debug("Recording started successfully")
             return {"message": "Recording started"}
         except Exception as e:
             self.recording = False
+            if self.capture:
+                await self.capture.stop()
+                # Nothing was recorded: leave no empty file behind for the history or crash recovery
+                if os.path.exists(self.capture.recording_path):
+                    os.remove(self.capture.recording_path)
             logger.error(f"Error starting recording: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error starting recording: {str(e)}")
 
-    async def stop_recording(self):
+    async def stop_recording(self, mode=None, refine=None):
+        """Stop recording and return the final transcription.
+
+        Args:
+            mode: "stitched" to assemble the transcript from the live segments, or
+                "full" to re-transcribe the saved recording (defaults to FINAL_TRANSCRIPTION_MODE)
+            refine: In stitched mode, re-transcribe the full recording in the background
+                and replace the stitched transcript when it finishes
+        """
         logger.debug("Stopping recording...")
         if not self.recording:
             logger.error("Not recording")
             raise HTTPException(status_code=400, detail="Not recording")
+        mode = mode or FINAL_TRANSCRIPTION_MODE
+        refine = REFINE_FINAL_TRANSCRIPTION if refine is None else refine
         try:
             self.stream.stop()
             self.stream.close()
-            logger.debug("Stream stopped, saving audio...")
-            # Process any remaining audio in the segment
-            if self.current_segment_audio:
-                await self.process_segment()
-            audio_path = await self.save_audio(f"recording_{time.strftime('%H%M%S')}.wav")
-            logger.debug(f"Audio saved at {audio_path}, transcribing full audio...")
-            transcription = await self.analyze_audio_file(audio_path, self.transcription_language)
+            logger.debug("Stream stopped, finalizing audio...")
+            # Flush the remaining audio as a last segment, patch the WAV header and wait for pending segments
+            await self.capture.stop()
+            live_complete = self.capture.complete
+            audio_path = await self.save_audio()
+            if mode == "stitched" and live_complete:
+                logger.debug(f"Audio saved at {audio_path}, stitching live segments...")
+                segments = self.stitch_real_time_segments()
+            else:
+                # Live segments are missing (dropped or failed) or a full pass was requested
+                logger.debug(f"Audio saved at {audio_path}, transcribing full audio...")
+                segments = await self.transcribe_file(audio_path, self.transcription_language)
+                mode = "full"
+            transcription = format_segments(segments)
             logger.debug("Transcription completed")
             self.transcription_text = transcription
+            if self.live_summary_enabled:
+                # Fold the last segments in now so /summarize only has to return the result
+                self.live_summary_transcripts.add(transcription)
+                self._schedule_live_summary(final=True)
             # Store in history
-            filename = os.path.basename(audio_path)
-            self.history.append({
-                "filename": filename,
+            history_id = self.history.add(audio_path, transcription, self.transcription_language,
+                                          refined=mode == "full", segments=segments)
+            if mode == "stitched" and refine:
+                task = asyncio.create_task(
+                    self._refine_transcription(history_id, audio_path, transcription, self.transcription_language)
+                )
+                self.refinement_tasks.add(task)
+                task.add_done_callback(self.refinement_tasks.discard)
+            return {
+                "id": history_id,
                 "audio_path": audio_path,
                 "transcription": transcription,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-            })
-            return {"audio_path": audio_path, "transcription": transcription}
+                "mode": mode,
+                "refining": mode == "stitched" and refine
+            }
         except Exception as e:
             logger.error(f"Error during recording stop: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error during recording stop: {str(e)}")
         finally:
             self.recording = False
+            self._publish("end", {})
             logger.debug("Recording state reset")
             if hasattr(self, 'stream') and self.stream:
                 try:
@@ -158,72 +314,261 @@ class TranscriptionService:
                 except Exception as e:
                     logger.error(f"Error closing stream: {str(e)}")
 
-    async def save_audio(self, filename):
-        """Save recorded audio to a WAV file."""
-        if not self.full_audio:
+    def stitch_real_time_segments(self):
+        """Assemble the final transcript segments from the live segments with absolute timestamps."""
+        items = sorted(self.real_time_transcriptions, key=lambda item: item["segment"])
+        return [
+            {"start": segment["start"] + item["start"], "end": segment["end"] + item["start"], "text": segment["text"]}
+            for item in items
+            for segment in item["segments"]
+        ]
+
+    async def _refine_transcription(self, history_id, audio_path, stitched, language):
+        """Transcribe the full recording and replace the stitched transcript in history."""
+        try:
+            segments = await self.transcribe_file(audio_path, language)
+        except Exception as e:
+            logger.error(f"Refinement of {audio_path} failed, keeping stitched transcript: {str(e)}")
+            return
+        transcription = format_segments(segments)
+        self.history.update_transcription(history_id, transcription, refined=True, segments=segments)
+        if self.transcription_text == stitched:
+            self.transcription_text = transcription
+        if stitched in self.live_summary_transcripts:
+            self.live_summary_transcripts.add(transcription)
+        logger.debug(f"Refined transcription for {audio_path}")
+
+    def _reset_live_summary(self):
+        if self.live_summary_task:
+            self.live_summary_task.cancel()
+        self.live_summary = None
+        self.live_summary_segments = 0
+        self.live_summary_transcripts = set()
+        self.live_summary_task = None
+
+    def _schedule_live_summary(self, final=False):
+        """Start folding new live segments into the rolling summary once enough have arrived."""
+        if not self.live_summary_enabled or (self.live_summary_task and not self.live_summary_task.done()):
+            return
+        pending = len(self.real_time_transcriptions) - self.live_summary_segments
+        if pending >= LIVE_SUMMARY_SEGMENTS or (final and pending):
+            self.live_summary_task = asyncio.create_task(self._update_live_summary())
+
+    async def _update_live_summary(self):
+        """Summarize the live segments not yet in the rolling summary and merge them in."""
+        async with self.live_summary_lock:
+            items = self.real_time_transcriptions[self.live_summary_segments:]
+            if not items:
+                return
+            language = self.transcription_language
+            delta = "".join(format_segments(item["segments"], offset=item["start"]) for item in items)
+            try:
+                self.live_summary = await update_rolling_summary(self.live_summary, delta, language)
+            except Exception as e:
+                logger.error(f"Live summary update failed, will retry with the next segments: {str(e)}")
+                return
+            self.live_summary_segments += len(items)
+            logger.debug(f"Live summary now covers {self.live_summary_segments} segments")
+        if not self.recording:
+            # Segments that arrived while this update ran, after the recording stopped
+            self._schedule_live_summary(final=True)
+
+    async def get_live_summary(self, transcription, language):
+        """Return the live summary if it covers ``transcription``, folding in any missing segments.
+
+        Returns None when the transcript is not this session's last recording (or was
+        edited), so the caller summarizes it from scratch.
+        """
+        if transcription not in self.live_summary_transcripts or language != self.transcription_language:
+            return None
+        await self._update_live_summary()
+        if self.live_summary is None or self.live_summary_segments < len(self.real_time_transcriptions):
+            return None
+        return {"summary": render_summary(self.live_summary, language), "structured_data": self.live_summary,
+                "live": True}
+
+    async def save_audio(self):
+        """Return the recording written during capture (finalized by ``capture.stop``).
+
+        The WAV is re-encoded with AUDIO_STORAGE_CODEC when one is configured.
+        """
+        audio_path = self.capture.recording_path
+        if not self.capture.written_samples:
+            os.remove(audio_path)
             raise HTTPException(status_code=400, detail="No audio recorded")
-        audio_path = os.path.join(self._ensure_session_dir(), filename)
-        audio_np = np.concatenate(self.full_audio, axis=0)
-        with wave.open(audio_path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(self.sample_rate)
-            wf.writeframes((audio_np * 32767).astype(np.int16).tobytes())
-        self.full_audio = []  # Clear after saving
-        logger.debug(f"Saved audio to: {audio_path}")
+        encoded_path = await encode_audio(audio_path, AUDIO_STORAGE_CODEC)
+        if encoded_path != audio_path:
+            os.remove(audio_path)
+            audio_path = encoded_path
+        logger.debug(f"Saved audio to: {audio_path} ({self.capture.written_samples} samples)")
         return audio_path
 
-    async def transcribe_audio_file(self, audio_path):
+    async def transcribe_audio_file(self, audio_path, audio_hash=None, language=None):
         """Transcribe an uploaded audio file and store in history."""
         if not os.path.exists(audio_path):
             raise HTTPException(status_code=404, detail="Audio file not found")
-        transcription = await self.analyze_audio_file(audio_path, self.transcription_language)
+        language = language or self.transcription_language
+        segments = await self.transcribe_file(audio_path, language, audio_hash)
+        transcription = format_segments(segments)
         self.transcription_text = transcription
         # Store in history
-        filename = os.path.basename(audio_path)
-        self.history.append({
-            "filename": filename,
-            "audio_path": audio_path,
-            "transcription": transcription,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        })
+        history_id = self.history.add(audio_path, transcription, language, segments=segments)
         logger.debug(f"Transcribed and added to history: {audio_path}")
-        return {"transcription": transcription}
+        return {"id": history_id, "transcription": transcription}
 
-    async def analyze_audio_file(self, audio_path, language="fr"):
+    async def analyze_audio_file(self, audio_path, language="fr", audio_hash=None):
         """Send audio file to Groq API for transcription.
-        
+
+        Long recordings are split into overlapping chunks transcribed in parallel.
+
         Args:
             audio_path: Path to the audio file
             language: Language code for transcription ("en" or "fr")
+            audio_hash: SHA-256 of the file if already known (computed otherwise)
         """
+        segments = await self.transcribe_file(audio_path, language, audio_hash)
+        return format_segments(segments)
+
+    async def transcribe_file(self, audio_path, language="fr", audio_hash=None):
+        """Return the segments of a whole file, chunking it when it is too long for one request.
+
+        Results are cached on disk by (audio SHA-256, language, model).
+        """
+        self.active_transcriptions += 1
         try:
-            with open(audio_path, 'rb') as audio_file:
-                transcription = self.client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-large-v3",
-                    response_format="verbose_json",
-                    language=language
-                )
-            transcription_text = ""
-            for segment in transcription.segments:
-                start_str = time.strftime('%M:%S', time.gmtime(segment["start"])) + f'.{int((segment["start"] % 1) * 1000):03d}'
-                end_str = time.strftime('%M:%S', time.gmtime(segment["end"])) + f'.{int((segment["end"] % 1) * 1000):03d}'
-                transcription_text += f"[{start_str} → {end_str}] {segment['text']}\n"
-            return transcription_text
+            if audio_hash is None:
+                audio_hash = await asyncio.to_thread(file_sha256, audio_path)
+            segments = transcription_cache.get(audio_hash, language, TRANSCRIPTION_MODEL)
+            if segments is not None:
+                logger.debug(f"Transcription cache hit for {audio_path}")
+                return segments
+            segments = await transcribe_in_chunks(audio_path, self.transcribe_segments, self.temp_dir, language)
+            if segments is None:
+                segments = await self.transcribe_segments(audio_path, language)
+            transcription_cache.set(segments, audio_hash, language, TRANSCRIPTION_MODEL)
+            return segments
+        finally:
+            self.active_transcriptions -= 1
+            self.touch()  # The idle timeout runs from the end of the transcription
+
+    async def transcribe_segments(self, audio_path, language="fr", priority=PRIORITY_BATCH):
+        """Send audio file to Groq API and return its segments as {"start", "end", "text"} dicts.
+
+        WAV files are encoded with AUDIO_UPLOAD_CODEC into a temporary directory before upload.
+        """
+        # Encoded into a directory of its own: concurrent calls may send files with the same base name
+        encode_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        upload_path = await encode_audio(audio_path, AUDIO_UPLOAD_CODEC, encode_dir)
+        try:
+            transcription = await upstream.transcribe(upload_path, language, priority=priority,
+                                                      on_response=lambda seconds: record_upload(upload_path, seconds))
+            return [
+                {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                for segment in transcription.segments
+            ]
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
+        finally:
+            shutil.rmtree(encode_dir, ignore_errors=True)
+
+    async def get_real_time_transcription(self, since=0):
+        """Return the real-time transcriptions of the current recording after segment number ``since``."""
+        logger.debug(f"Returning real-time transcriptions since segment {since}")
+        return {
+            "transcriptions": [public_segment(item) for item in self.real_time_transcriptions if item["segment"] > since],
+            "recording": self.recording
+        }
+
+    def _publish(self, event, data):
+        for subscriber in self.segment_subscribers:
+            subscriber.put_nowait((event, data))
+
+    async def stream_real_time_transcription(self, cursor=0, heartbeat=15):
+        """Server-Sent Events stream of live segments after segment number ``cursor``.
+
+        Each segment is sent with its segment number as the event id, so a reconnecting
+        client resumes from its Last-Event-ID. An "end" event is sent when recording stops.
+        """
+        subscriber = asyncio.Queue()
+        self.segment_subscribers.add(subscriber)
+        try:
+            # Subscribe before replaying the backlog so no segment falls in between
+            for item in list(self.real_time_transcriptions):
+                if item["segment"] > cursor:
+                    cursor = item["segment"]
+                    yield f"id: {cursor}\nevent: segment\ndata: {json.dumps(public_segment(item))}\n\n"
+            if not self.recording:
+                yield "event: end\ndata: {}\n\n"
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(subscriber.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event == "end":
+                    yield "event: end\ndata: {}\n\n"
+                    return
+                if data["segment"] > cursor:
+                    cursor = data["segment"]
+                    yield f"id: {cursor}\nevent: segment\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.segment_subscribers.discard(subscriber)
+
+    async def close(self):
+        """Stop any active recording and release the session's resources."""
+        if self.recording:
+            try:
+                self.stream.stop()
+                self.stream.close()
+                await self.capture.stop()
+            except Exception as e:
+                logger.error(f"Error stopping recording of session {self.session_id}: {str(e)}")
+            self.recording = False
+            self._publish("end", {})
+        if self.live_summary_task:
+            self.live_summary_task.cancel()
+        if self.refinement_tasks:
+            # Let background refinements finish before removing their working directory
+            await asyncio.gather(*self.refinement_tasks, return_exceptions=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @property
+    def busy(self):
+        """True while recording, receiving an upload or transcribing, when the session must not be evicted."""
+        return self.recording or bool(self.refinement_tasks or self.active_uploads) or self.active_transcriptions > 0
+
+    def get_info(self):
+        return {
+            "session_id": self.session_id,
+            "language": self.transcription_language,
+            "recording": self.recording,
+            "session_dir": self.session_dir,
+            "live_segments": len(self.real_time_transcriptions),
+            "live_summary": self.live_summary_enabled,
+            "live_summary_segments": self.live_summary_segments,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created)),
+            "idle_seconds": time.monotonic() - self.last_active,
+        }
 
-    async def get_history(self):
-        """Return the history of uploaded files and transcriptions."""
-        logger.debug("Returning history")
-        return {"history": self.history}
+    async def get_capture_metrics(self):
+        """Return backpressure metrics for the live capture pipeline."""
+        if not self.capture:
+            return {"recording": self.recording, "capture": None}
+        return {"recording": self.recording, "capture": self.capture.get_metrics()}
 
-    async def get_real_time_transcription(self):
-        """Return the real-time transcriptions for the current recording session."""
-        logger.debug("Returning real-time transcriptions")
-        return {"transcriptions": self.real_time_transcriptions}
+    async def get_upload_metrics(self):
+        """Return progress of in-flight uploads (as received from the client) and aggregate throughput."""
+        now = time.perf_counter()
+        in_progress = [
+            {"filename": progress["filename"], "bytes_received": progress["bytes_received"],
+             "expected_bytes": progress["expected_bytes"], "elapsed": now - progress["started"]}
+            for progress in self.active_uploads.values()
+        ]
+        stats = self.upload_stats
+        average = stats["bytes"] / stats["seconds"] if stats["seconds"] else None
+        return {"in_progress": in_progress, **stats, "average_throughput": average}
 
     async def get_latest_transcription(self):
         """Return the latest transcription."""
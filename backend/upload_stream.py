@@ -0,0 +1,80 @@
+# upload_stream.py
+import os
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MultipartUpload:
+    """The file field of a multipart/form-data request, read from the body as it arrives.
+
+    FastAPI's ``UploadFile`` is only handed over once the whole body has been
+    spooled to a temporary file; reading ``request.stream()`` instead lets the
+    caller enforce size limits and report progress while the client is sending.
+    """
+
+    def __init__(self, request: Request, field="file"):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+        self.request = request
+        self.field = field
+        self.filename = None
+        self.content_length = int(request.headers.get("content-length") or 0) or None
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._in_file = False
+        self._found = False
+        self._data = []
+        self.parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._in_file = name == self.field and not self._found and b"filename" in options
+        if self._in_file:
+            self._found = True
+            # Only the base name is kept so a crafted filename cannot escape the session directory
+            self.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace")) or None
+
+    def _on_part_data(self, data, start, end):
+        if self._in_file:
+            self._data.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        self._in_file = False
+
+    async def chunks(self):
+        """Yield the bytes of the file field as they are received (``filename`` is set by the first one)."""
+        async for body in self.request.stream():
+            self.parser.write(body)
+            if self._data:
+                data, self._data = self._data, []
+                yield b"".join(data)
+        self.parser.finalize()
+        if not self._found:
+            raise HTTPException(status_code=400, detail=f"Missing '{self.field}' file field")
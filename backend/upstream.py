@@ -0,0 +1,357 @@
+# upstream.py
+import os
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import random
+import time
+from collections import deque
+import httpx
+from groq import AsyncGroq, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upstream configuration (overridable through the environment)
+GROQ_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", "120"))
+GROQ_CONNECT_TIMEOUT = float(os.environ.get("GROQ_CONNECT_TIMEOUT", "10"))
+GROQ_MAX_CONNECTIONS = int(os.environ.get("GROQ_MAX_CONNECTIONS", "20"))
+DEFAULT_MODEL_CONCURRENCY = int(os.environ.get("GROQ_MODEL_CONCURRENCY", "4"))
+MODEL_CONCURRENCY = {
+    "whisper-large-v3": int(os.environ.get("WHISPER_CONCURRENCY", str(DEFAULT_MODEL_CONCURRENCY))),
+    "llama3-70b-8192": int(os.environ.get("LLAMA_CONCURRENCY", str(DEFAULT_MODEL_CONCURRENCY))),
+}
+# Requests per minute allowed per model (token bucket refill rate, burst up to GROQ_BURST)
+DEFAULT_MODEL_RPM = float(os.environ.get("GROQ_RPM", "30"))
+MODEL_RPM = {
+    "whisper-large-v3": float(os.environ.get("WHISPER_RPM", "20")),
+    "llama3-70b-8192": float(os.environ.get("LLAMA_RPM", str(DEFAULT_MODEL_RPM))),
+}
+GROQ_BURST = int(os.environ.get("GROQ_BURST", "5"))
+# Retries of rate-limited, timed-out and 5xx calls, with full-jitter exponential backoff
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "5"))
+GROQ_BACKOFF_BASE = float(os.environ.get("GROQ_BACKOFF_BASE", "1"))
+GROQ_BACKOFF_MAX = float(os.environ.get("GROQ_BACKOFF_MAX", "60"))
+
+TRANSCRIPTION_MODEL = "whisper-large-v3"
+CHAT_MODEL = "llama3-70b-8192"
+
+# Priority classes, most urgent first
+PRIORITY_LIVE = 0  # Live recording segments
+PRIORITY_INTERACTIVE = 1  # Chat answers someone is waiting for
+PRIORITY_BATCH = 2  # Uploads, full-recording (re-)transcription
+PRIORITY_SUMMARY = 3  # Summaries
+PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_INTERACTIVE: "interactive",
+                  PRIORITY_BATCH: "batch", PRIORITY_SUMMARY: "summary"}
+
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class TokenBucket:
+    """Request-rate limiter: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def wait_time(self):
+        """Seconds until a token can be taken (0 if one is available now)."""
+        now = self._refill()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def block(self, seconds):
+        """Stop handing out tokens for ``seconds`` (after a 429) and drain the burst."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class ModelLane:
+    """Admission control for one model: concurrency limit, token bucket and a priority queue."""
+
+    def __init__(self, model):
+        self.limit = MODEL_CONCURRENCY.get(model, DEFAULT_MODEL_CONCURRENCY)
+        self.bucket = TokenBucket(MODEL_RPM.get(model, DEFAULT_MODEL_RPM) / 60, GROQ_BURST)
+        self.waiters = []  # heap of (priority, sequence)
+        self.sequence = itertools.count()
+        self.condition = asyncio.Condition()
+        self.in_flight = 0
+
+    async def acquire(self, priority):
+        """Wait until this request is the most urgent waiter and a slot and a token are free."""
+        entry = (priority, next(self.sequence))
+        async with self.condition:
+            heapq.heappush(self.waiters, entry)
+            try:
+                while True:
+                    if self.waiters[0] == entry and self.in_flight < self.limit:
+                        wait = self.bucket.wait_time()
+                        if wait <= 0:
+                            break
+                        try:
+                            await asyncio.wait_for(self.condition.wait(), wait)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self.condition.wait()
+            except BaseException:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+                self.condition.notify_all()
+                raise
+            heapq.heappop(self.waiters)
+            self.bucket.take()
+            self.in_flight += 1
+            self.condition.notify_all()
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def waiting_by_priority(self):
+        counts = {}
+        for priority, _ in self.waiters:
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+def _retry_after(error):
+    """Seconds requested by the server's Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class UpstreamClient:
+    """Shared async Groq client and scheduler for every upstream call.
+
+    Calls are admitted per model through a priority queue (live segments first,
+    summaries last), a concurrency limit and a requests-per-minute token bucket.
+    Rate-limited, timed-out and 5xx calls are retried with full-jitter exponential
+    backoff (honouring Retry-After), and identical requests already in flight are
+    coalesced into one upstream call.
+    """
+
+    def __init__(self):
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        )
+        # Retries are handled by the scheduler so they respect priorities and the rate limit
+        self.client = AsyncGroq(http_client=self.http_client, timeout=GROQ_TIMEOUT, max_retries=0)
+        self.lanes = {}
+        self.stats = {}
+        self.pending = {}  # request key -> task of the in-flight call
+        self.recent_streams = deque(maxlen=100)  # Per-request latency of the last streamed completions
+
+    def _lane(self, model):
+        if model not in self.lanes:
+            self.lanes[model] = ModelLane(model)
+            self.stats[model] = {
+                "in_flight": 0, "waiting": 0, "completed": 0, "failed": 0, "total_latency": 0.0,
+                "retries": 0, "rate_limited": 0, "coalesced": 0,
+                "streams": 0, "total_time_to_first_token": 0.0,
+            }
+        return self.lanes[model]
+
+    async def _call(self, model, request, priority=PRIORITY_BATCH, key=None):
+        """Run ``request`` through the scheduler, sharing the result with identical in-flight calls."""
+        lane = self._lane(model)
+        stats = self.stats[model]
+        if key is not None:
+            task = self.pending.get(key)
+            if task is not None:
+                stats["coalesced"] += 1
+                return await asyncio.shield(task)
+            task = asyncio.ensure_future(self._call_with_retries(model, lane, stats, request, priority))
+            self.pending[key] = task
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+            # Shielded so one caller giving up does not cancel the call for the others
+            return await asyncio.shield(task)
+        return await self._call_with_retries(model, lane, stats, request, priority)
+
+    async def _call_with_retries(self, model, lane, stats, request, priority):
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                stats["waiting"] += 1
+                try:
+                    await lane.acquire(priority)
+                finally:
+                    stats["waiting"] -= 1
+                stats["in_flight"] += 1
+                try:
+                    result = await request()
+                    stats["completed"] += 1
+                    return result
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= GROQ_MAX_RETRIES:
+                        stats["failed"] += 1
+                        raise
+                    attempt += 1
+                    delay = self._retry_delay(model, lane, stats, e, attempt)
+                except Exception:
+                    stats["failed"] += 1
+                    raise
+                finally:
+                    stats["in_flight"] -= 1
+                    await lane.release()
+                await asyncio.sleep(delay)
+        finally:
+            stats["total_latency"] += time.perf_counter() - started
+
+    @staticmethod
+    def _retry_delay(model, lane, stats, error, attempt):
+        """Full-jitter backoff before retry number ``attempt``; a 429 also pauses the model's bucket."""
+        delay = random.uniform(0, min(GROQ_BACKOFF_MAX, GROQ_BACKOFF_BASE * 2 ** (attempt - 1)))
+        if isinstance(error, RateLimitError):
+            stats["rate_limited"] += 1
+            delay = max(delay, _retry_after(error) or 0.0)
+            lane.bucket.block(delay)
+        stats["retries"] += 1
+        logger.warning(f"{model} call failed ({type(error).__name__}), retry {attempt} in {delay:.1f}s")
+        return delay
+
+    async def transcribe(self, audio_path, language, model=TRANSCRIPTION_MODEL, priority=PRIORITY_BATCH,
+                         on_response=None):
+        """Transcribe an audio file with Whisper and return the verbose JSON response.
+
+        ``on_response(seconds)`` is called with the round trip of the request that
+        succeeded, excluding queueing and retries (not called for a coalesced caller).
+        """
+        # Read off the event loop so large recordings do not stall other requests
+        content = await asyncio.to_thread(_read_bytes, audio_path)
+        key = ("transcribe", model, language, hashlib.sha256(content).hexdigest())
+
+        async def request():
+            started = time.perf_counter()
+            response = await self.client.audio.transcriptions.create(
+                file=(os.path.basename(audio_path), content),
+                model=model,
+                response_format="verbose_json",
+                language=language
+            )
+            if on_response:
+                on_response(time.perf_counter() - started)
+            return response
+        return await self._call(model, request, priority, key)
+
+    async def chat(self, messages, model=CHAT_MODEL, priority=PRIORITY_INTERACTIVE, **kwargs):
+        """Run a chat completion and return the full response."""
+        key = ("chat", model, json.dumps([messages, kwargs], sort_keys=True, default=str))
+        return await self._call(model, lambda: self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            **kwargs
+        ), priority, key)
+
+    async def chat_stream(self, messages, model=CHAT_MODEL, priority=PRIORITY_INTERACTIVE, tag=None, **kwargs):
+        """Run a streaming chat completion, yielding content deltas as they arrive.
+
+        Admission and retries work as for ``chat``, but a call is only retried until
+        its first token has been yielded. Time to first token and total latency are
+        recorded per request under ``tag``.
+        """
+        lane = self._lane(model)
+        stats = self.stats[model]
+        started = time.perf_counter()
+        first_token = None
+        chunks = 0
+        attempt = 0
+        while True:
+            stats["waiting"] += 1
+            try:
+                await lane.acquire(priority)
+            finally:
+                stats["waiting"] -= 1
+            stats["in_flight"] += 1
+            try:
+                stream = await self.client.chat.completions.create(
+                    messages=messages, model=model, stream=True, **kwargs
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        chunks += 1
+                        yield delta
+                stats["completed"] += 1
+                break
+            except RETRYABLE_ERRORS as e:
+                if first_token is not None or attempt >= GROQ_MAX_RETRIES:
+                    stats["failed"] += 1
+                    raise
+                attempt += 1
+                delay = self._retry_delay(model, lane, stats, e, attempt)
+            except BaseException:
+                stats["failed"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+                await lane.release()
+            await asyncio.sleep(delay)
+        total = time.perf_counter() - started
+        stats["streams"] += 1
+        stats["total_latency"] += total
+        stats["total_time_to_first_token"] += first_token or total
+        self.recent_streams.append({
+            "tag": tag, "model": model, "time_to_first_token": first_token, "total_latency": total,
+            "chunks": chunks, "retries": attempt, "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    async def close(self):
+        await self.http_client.aclose()
+
+    def get_metrics(self):
+        metrics = {}
+        for model, stats in self.stats.items():
+            lane = self.lanes[model]
+            finished = stats["completed"] + stats["failed"]
+            metrics[model] = {
+                **stats,
+                "concurrency_limit": lane.limit,
+                "requests_per_minute": lane.bucket.rate * 60,
+                "waiting_by_priority": lane.waiting_by_priority(),
+                "average_latency": stats["total_latency"] / finished if finished else None,
+                "average_time_to_first_token":
+                    stats["total_time_to_first_token"] / stats["streams"] if stats["streams"] else None,
+            }
+        return metrics
+
+    def get_stream_metrics(self):
+        """Time to first token and total latency of the most recent streamed requests."""
+        return list(self.recent_streams)
+
+
+upstream = UpstreamClient()
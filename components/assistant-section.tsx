@@ -64,7 +64,17 @@ export default function AssistantSection({ t, isActive }: AssistantSectionProps)
         processes: localStorage.getItem("processesList") || "",
       }
 
-      const data = await ApiService.sendChatMessage(question, context, chatHistory)
+      // Show the answer as it is written, in place of the loading message
+      let partial = ""
+      const data = await ApiService.streamChatQuestion(
+        question,
+        (text) => {
+          partial += text
+          setMessages((prev) => prev.map((msg) => (msg.id === loadingId ? { ...msg, type: "bot", content: partial } : msg)))
+        },
+        context,
+        chatHistory,
+      )
 
       // Update chat history
       setChatHistory((prev) => [...prev, `User: ${question}`, `Assistant: ${data.response}`])
@@ -7,10 +7,12 @@ import { showToast } from "@/lib/utils"
 import { ApiService } from "@/lib/api-service"
 
 interface HistoryItem {
+  id: number
   filename: string
   timestamp: string
   audio_path: string
-  transcription: string
+  preview: string
+  transcription_length: number
 }
 
 interface HistorySectionProps {
@@ -23,6 +25,7 @@ interface HistorySectionProps {
 export default function HistorySection({ updateStatus, t, setActiveTab, isActive }: HistorySectionProps) {
   const [history, setHistory] = useState<HistoryItem[]>([])
   const [expandedItems, setExpandedItems] = useState<Record<number, boolean>>({})
+  const [fullTranscriptions, setFullTranscriptions] = useState<Record<number, string>>({})
 
   useEffect(() => {
     if (isActive) {
@@ -39,14 +42,32 @@ export default function HistorySection({ updateStatus, t, setActiveTab, isActive
     }
   }
 
-  const toggleTranscriptionExpand = (index: number) => {
+  // Full transcripts are fetched on demand; the history list only carries a preview
+  const fetchFullTranscription = async (id: number) => {
+    if (fullTranscriptions[id] !== undefined) {
+      return fullTranscriptions[id]
+    }
+    const item = await ApiService.getHistoryItem(id)
+    setFullTranscriptions((prev) => ({ ...prev, [id]: item.transcription }))
+    return item.transcription
+  }
+
+  const toggleTranscriptionExpand = async (index: number) => {
+    if (!expandedItems[index]) {
+      try {
+        await fetchFullTranscription(history[index].id)
+      } catch (error: any) {
+        showToast(`Error: ${error.message}`)
+        return
+      }
+    }
     setExpandedItems((prev) => ({
       ...prev,
       [index]: !prev[index],
     }))
   }
 
-  const loadTranscriptionFromHistory = async (audioPath: string, transcription: string) => {
+  const loadTranscriptionFromHistory = async (id: number, audioPath: string) => {
     if (!audioPath) {
       showToast("Audio path not available")
       console.error("No audio path provided")
@@ -55,6 +76,8 @@ export default function HistorySection({ updateStatus, t, setActiveTab, isActive
 
     updateStatus("Loading transcription...", "loading")
     try {
+      const transcription = await fetchFullTranscription(id)
+
       // Store the transcription and audio path in localStorage
       localStorage.setItem("loadedTranscription", transcription)
       localStorage.setItem("currentTranscription", transcription)
@@ -105,11 +128,10 @@ export default function HistorySection({ updateStatus, t, setActiveTab, isActive
             ) : (
               history.map((item, index) => {
                 const isExpanded = expandedItems[index] || false
-                const truncatedText =
-                  item.transcription.length > 500 ? item.transcription.substring(0, 500) + "..." : item.transcription
+                const truncatedText = item.transcription_length > item.preview.length ? item.preview + "..." : item.preview
 
                 return (
-                  <div className="history-item" key={index} data-index={index}>
+                  <div className="history-item" key={item.id} data-index={index}>
                     <div className="history-item-header">
                       <span className="history-item-filename">
                         <i className="fas fa-file-audio"></i> {item.filename || "Recording"}
@@ -128,7 +150,7 @@ export default function HistorySection({ updateStatus, t, setActiveTab, isActive
                         } as React.CSSProperties
                       }
                     >
-                      {isExpanded ? item.transcription : truncatedText}
+                      {isExpanded ? fullTranscriptions[item.id] : truncatedText}
                     </div>
                     <div className="history-item-actions">
                       <button
@@ -147,7 +169,7 @@ export default function HistorySection({ updateStatus, t, setActiveTab, isActive
                       </button>
                       <button
                         className="load-btn"
-                        onClick={() => loadTranscriptionFromHistory(item.audio_path, item.transcription)}
+                        onClick={() => loadTranscriptionFromHistory(item.id, item.audio_path)}
                       >
                         <i className="fas fa-clipboard-check"></i> Load Transcription
                       </button>
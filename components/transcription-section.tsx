@@ -48,8 +48,8 @@ export default function TranscriptionSection({ updateStatus, t, isActive }: Tran
     uploadedAudio: { visible: false, src: null },
   })
 
-  let transcriptionInterval: NodeJS.Timeout | null = null
-  let lastSegmentCount = 0
+  const transcriptionStreamRef = useRef<EventSource | null>(null)
+  const lastSegmentRef = useRef(0)
 
   useEffect(() => {
     // Check for loaded transcription and audio when component becomes active
@@ -71,21 +71,37 @@ export default function TranscriptionSection({ updateStatus, t, isActive }: Tran
       localStorage.removeItem('loadedAudioPath')
       localStorage.removeItem('audioPlayerState')
     }
+  }, [isActive])
+
+  useEffect(() => {
+    // Segments are pushed by the server as soon as each one is transcribed. The stream is closed
+    // while the tab is hidden and reopened after the last segment received when it comes back.
+    if (!isActive || !isRecording) return
+    let closed = false
+    ApiService.streamRealTimeTranscription(appendRealTimeSegment, undefined, lastSegmentRef.current)
+      .then((source) => {
+        if (closed) {
+          source.close()
+        } else {
+          transcriptionStreamRef.current = source
+        }
+      })
+      .catch((error: any) => updateStatus(`Error: ${error.message}`, "error"))
 
     return () => {
-      if (transcriptionInterval) {
-        clearInterval(transcriptionInterval)
-      }
+      closed = true
+      transcriptionStreamRef.current?.close()
+      transcriptionStreamRef.current = null
     }
-  }, [isActive])
+  }, [isActive, isRecording])
 
   const startRecording = async () => {
     updateStatus("startingRecording", "loading")
     try {
       const data = await ApiService.startRecording(transcriptionLanguage)
       updateStatus("recordingInProgress", "loading")
+      lastSegmentRef.current = 0
       setIsRecording(true)
-      lastSegmentCount = 0
       setRealTimeTranscription("")
 
       // Hide all audio players when starting a new recording
@@ -94,9 +110,6 @@ export default function TranscriptionSection({ updateStatus, t, isActive }: Tran
         loadedAudio: { visible: false, src: null },
         uploadedAudio: { visible: false, src: null },
       })
-
-      transcriptionInterval = setInterval(fetchRealTimeTranscription, 10000)
-      fetchRealTimeTranscription()
     } catch (error: any) {
       updateStatus(`Error: ${error.message}`, "error")
     }
@@ -124,11 +137,9 @@ export default function TranscriptionSection({ updateStatus, t, isActive }: Tran
 
       updateStatus("recordingStopped")
 
-      // Clear interval
-      if (transcriptionInterval) {
-        clearInterval(transcriptionInterval)
-        transcriptionInterval = null
-      }
+      // Close the real-time stream
+      transcriptionStreamRef.current?.close()
+      transcriptionStreamRef.current = null
 
       // Update recording state after successful API call and cleanup
       setIsRecording(false)
@@ -170,34 +181,18 @@ export default function TranscriptionSection({ updateStatus, t, isActive }: Tran
     }
   }
 
-  const fetchRealTimeTranscription = async () => {
-    if (!isRecording) return
-    try {
-      const data = await ApiService.getRealTimeTranscription()
-      if (data.transcriptions && data.transcriptions.length > 0) {
-        const transcriptions = data.transcriptions
-        // Process all segments and update display
-        const allText = transcriptions
-          .map(segment => segment.transcription || '')
-          .filter(text => text.trim() !== '')
-          .join('\n')
-
-        if (allText) {
-          setRealTimeTranscription(allText)
-          lastSegmentCount = transcriptions.length
-
-          // Scroll to bottom after state update
-          setTimeout(() => {
-            if (realTimeTranscriptionRef.current) {
-              realTimeTranscriptionRef.current.scrollTop = realTimeTranscriptionRef.current.scrollHeight
-            }
-          }, 100)
-        }
+  const appendRealTimeSegment = (segment: { segment: number; transcription: string }) => {
+    lastSegmentRef.current = Math.max(lastSegmentRef.current, segment.segment)
+    const text = (segment.transcription || "").trim()
+    if (!text) return
+    setRealTimeTranscription((prev) => (prev ? `${prev}\n${text}` : text))
+
+    // Scroll to bottom after state update
+    setTimeout(() => {
+      if (realTimeTranscriptionRef.current) {
+        realTimeTranscriptionRef.current.scrollTop = realTimeTranscriptionRef.current.scrollHeight
       }
-    } catch (error) {
-      console.error("Error fetching real-time transcription:", error)
-      updateStatus("Error fetching real-time transcription", "error")
-    }
+    }, 100)
   }
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
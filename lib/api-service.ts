@@ -54,13 +54,46 @@ interface ReportRequest {
 
 // API Service class
 export class ApiService {
+  // Backend recording session, created once per browser and reused across page loads
+  private static sessionId: string | null = null
+  // Server-side chat session and the context it was created with
+  private static chatSession: { id: string; contextKey: string } | null = null
+
+  /**
+   * Get this browser's recording session id, creating a session on the backend if needed
+   * @param verify Check that the backend still has the session (it may have been evicted)
+   */
+  static async getSessionId(verify = false): Promise<string> {
+    if (!this.sessionId && typeof window !== "undefined") {
+      this.sessionId = localStorage.getItem("sessionId")
+    }
+    if (this.sessionId) {
+      if (!verify) return this.sessionId
+      const check = await fetch(`${BASE_URL}/sessions/${this.sessionId}`)
+      if (check.ok) return this.sessionId
+    }
+
+    const response = await fetch(`${BASE_URL}/sessions`, { method: "POST" })
+    if (!response.ok) {
+      const errorData = await response.json()
+      throw new Error(errorData.detail || "Failed to create session")
+    }
+    const data = await response.json()
+    this.sessionId = data.session_id as string
+    localStorage.setItem("sessionId", data.session_id)
+    return data.session_id
+  }
+
   /**
    * Start recording audio
    * @param language Language code (en or fr)
+   * @param liveSummary Keep a rolling summary while recording (server default if omitted)
    */
-  static async startRecording(language = "fr"): Promise<{ message: string }> {
+  static async startRecording(language = "fr", liveSummary?: boolean): Promise<{ message: string }> {
     try {
-      const response = await fetch(`${BASE_URL}/start_recording?language=${language}`, {
+      const sessionId = await this.getSessionId(true)
+      const liveSummaryParam = liveSummary === undefined ? "" : `&live_summary=${liveSummary}`
+      const response = await fetch(`${BASE_URL}/start_recording?language=${language}&session_id=${sessionId}${liveSummaryParam}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
       })
@@ -82,7 +115,8 @@ export class ApiService {
    */
   static async stopRecording(): Promise<{ audio_path: string; transcription: string }> {
     try {
-      const response = await fetch(`${BASE_URL}/stop_recording`, {
+      const sessionId = await this.getSessionId()
+      const response = await fetch(`${BASE_URL}/stop_recording?session_id=${sessionId}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
       })
@@ -112,7 +146,8 @@ export class ApiService {
       const formData = new FormData()
       formData.append("file", file)
 
-      const response = await fetch(`${BASE_URL}/upload_audio?language=${language}`, {
+      const sessionId = await this.getSessionId(true)
+      const response = await fetch(`${BASE_URL}/upload_audio?language=${language}&session_id=${sessionId}`, {
         method: "POST",
         body: formData,
       })
@@ -130,11 +165,13 @@ export class ApiService {
   }
 
   /**
-   * Get transcription history
+   * Get one page of transcription history (metadata and preview only)
+   * @param limit Page size
+   * @param offset Number of items to skip
    */
-  static async getHistory(): Promise<{ history: any[] }> {
+  static async getHistory(limit = 50, offset = 0): Promise<{ history: any[]; total: number }> {
     try {
-      const response = await fetch(`${BASE_URL}/history`)
+      const response = await fetch(`${BASE_URL}/history?limit=${limit}&offset=${offset}`)
 
       if (!response.ok) {
         const errorData = await response.json()
@@ -148,12 +185,34 @@ export class ApiService {
     }
   }
 
+  /**
+   * Get the full transcription of one history item
+   * @param id History item id
+   */
+  static async getHistoryItem(id: number): Promise<{ id: number; audio_path: string; transcription: string }> {
+    try {
+      const response = await fetch(`${BASE_URL}/history/${id}`)
+
+      if (!response.ok) {
+        const errorData = await response.json()
+        throw new Error(errorData.detail || "Failed to retrieve transcription")
+      }
+
+      return await response.json()
+    } catch (error: any) {
+      console.error("History item retrieval error:", error)
+      throw error
+    }
+  }
+
   /**
    * Get real-time transcription
+   * @param since Only return segments after this segment number
    */
-  static async getRealTimeTranscription(): Promise<{ transcriptions: any[] }> {
+  static async getRealTimeTranscription(since = 0): Promise<{ transcriptions: any[]; recording: boolean }> {
     try {
-      const response = await fetch(`${BASE_URL}/real_time_transcription`)
+      const sessionId = await this.getSessionId()
+      const response = await fetch(`${BASE_URL}/real_time_transcription?since=${since}&session_id=${sessionId}`)
 
       if (!response.ok) {
         const errorData = await response.json()
@@ -167,6 +226,35 @@ export class ApiService {
     }
   }
 
+  /**
+   * Subscribe to real-time transcription segments pushed by the server (Server-Sent Events).
+   * The browser resumes from the last received segment when the connection drops.
+   * @param onSegment Called for each new segment
+   * @param onEnd Called once when the recording stops
+   * @param cursor Only receive segments after this segment number
+   */
+  static async streamRealTimeTranscription(
+    onSegment: (segment: { segment: number; transcription: string; timestamp: string; start: number }) => void,
+    onEnd?: () => void,
+    cursor = 0,
+  ): Promise<EventSource> {
+    const sessionId = await this.getSessionId()
+    const source = new EventSource(
+      `${BASE_URL}/real_time_transcription/stream?cursor=${cursor}&session_id=${sessionId}`,
+    )
+    source.addEventListener("segment", (event) => {
+      onSegment(JSON.parse((event as MessageEvent).data))
+    })
+    source.addEventListener("end", () => {
+      source.close()
+      onEnd?.()
+    })
+    source.onerror = (error) => {
+      console.error("Real-time transcription stream error:", error)
+    }
+    return source
+  }
+
   /**
    * Summarize transcription
    * @param transcription Transcription text
@@ -174,7 +262,9 @@ export class ApiService {
    */
   static async summarize(transcription: string, language = "fr"): Promise<{ summary: string; structured_data: any }> {
     try {
-      const response = await fetch(`${BASE_URL}/summarize?language=${language}`, {
+      // The session lets the server reuse the summary it built during the recording
+      const sessionId = await this.getSessionId()
+      const response = await fetch(`${BASE_URL}/summarize?language=${language}&session_id=${sessionId}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ transcription }),
@@ -192,6 +282,32 @@ export class ApiService {
     }
   }
 
+  /**
+   * Read a Server-Sent Events response from a POST request: calls onToken for each "token" event
+   * and resolves with the data of the final "done" event
+   */
+  private static async readEventStream(response: Response, onToken: (text: string) => void): Promise<any> {
+    const reader = response.body!.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ""
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      let boundary
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        const event = block.match(/^event: (.*)$/m)?.[1]
+        const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] || "{}")
+        if (event === "token") onToken(data.text)
+        else if (event === "done") return data
+        else if (event === "error") throw new Error(data.detail)
+      }
+    }
+    throw new Error("Stream ended before completion")
+  }
+
   /**
    * Generate audit report
    * @param data Report data
@@ -249,4 +365,58 @@ export class ApiService {
       throw error
     }
   }
+
+  /**
+   * Ask a question in a server-side chat session, receiving the answer as it is written.
+   * The context is uploaded once per session; a new session is created when the context
+   * changes or the server no longer has the session.
+   * @param question User question
+   * @param onToken Called with each piece of the answer
+   * @param context Context data
+   * @param chatHistory Chat history, used to seed a new session
+   */
+  static async streamChatQuestion(
+    question: string,
+    onToken: (text: string) => void,
+    context: ChatRequest["context"] = {},
+    chatHistory: string[] = [],
+  ): Promise<{ response: string }> {
+    try {
+      const contextKey = JSON.stringify(context)
+      for (let attempt = 0; attempt < 2; attempt++) {
+        if (!this.chatSession || this.chatSession.contextKey !== contextKey) {
+          const created = await fetch(`${BASE_URL}/chat/sessions`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ context, chat_history: chatHistory }),
+          })
+          if (!created.ok) {
+            const errorData = await created.json()
+            throw new Error(errorData.detail || "Failed to create chat session")
+          }
+          this.chatSession = { id: (await created.json()).chat_session_id, contextKey }
+        }
+
+        const response = await fetch(`${BASE_URL}/chat/sessions/${this.chatSession.id}/messages/stream`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ question }),
+        })
+        if (response.status === 404) {
+          // Session expired on the server: start a new one
+          this.chatSession = null
+          continue
+        }
+        if (!response.ok) {
+          const errorData = await response.json()
+          throw new Error(errorData.detail || "Failed to get chat response")
+        }
+        return await this.readEventStream(response, onToken)
+      }
+      throw new Error("Failed to get chat response")
+    } catch (error: any) {
+      console.error("Chat error:", error)
+      throw error
+    }
+  }
 }